@@ -0,0 +1,371 @@
+import fcntl
+import os
+import tempfile
+from contextlib import contextmanager
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Column types of the datasets shared by the API and the recommendation jobs
+BLOG_DATA_DTYPES = {
+    "blog_id": "int32",
+    "content": "string",
+    "topic": "category",
+    "clean_blog_content": "string",
+}
+RATINGS_DTYPES = {
+    "blog_id": "int32",
+    "userId": "int32",
+    "ratings": "float32",
+}
+TOP_K_DTYPES = {
+    "userId": "int32",
+    "blog_id": "int32",
+    "prediction": "float32",
+    "topic": "category",
+    "timestamp": "datetime64[ns]",
+}
+
+
+def columnar_path(csv_path: str):
+    """
+    Returns the path of the Parquet file that stores the dataset of a CSV path.
+
+    Parameters:
+    csv_path (str): Path of the dataset in CSV format.
+
+    Returns:
+    str: The same path with a .parquet extension.
+    """
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def _apply_dtypes(df, dtypes):
+    if not dtypes:
+        return df
+    dtypes = {column: dtype for column, dtype in dtypes.items() if column in df.columns}
+    for column, dtype in dtypes.items():
+        if dtype.startswith("datetime64"):
+            df[column] = pd.to_datetime(df[column])
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def _temp_path(path):
+    # A unique temporary file next to `path`: the API and the worker may write the same dataset
+    # at the same time, and os.replace is only atomic within a file system
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                    suffix=".tmp")
+    os.close(fd)
+    # mkstemp creates the file readable by its owner only
+    os.chmod(tmp_path, 0o644)
+    return tmp_path
+
+
+def write_atomically(path: str, write):
+    """
+    Writes a file through a temporary file renamed over it, so readers never see a partially
+    written file and a failed write leaves the previous file in place.
+
+    Parameters:
+    path (str): Path of the file.
+    write (callable): Writes the content of the file to the binary file object it is given.
+    """
+    tmp_path = _temp_path(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_parquet(df, path):
+    write_atomically(path, lambda f: df.to_parquet(f, index=False))
+
+
+def _is_imported(csv_path):
+    # The Parquet file exists and is at least as recent as the CSV
+    parquet_path = columnar_path(csv_path)
+    return os.path.exists(parquet_path) and (not os.path.exists(csv_path)
+                                             or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path))
+
+
+def read_dataset(csv_path: str, dtypes: dict = None, columns: list = None):
+    """
+    Reads a dataset from its Parquet file.
+
+    If the Parquet file does not exist yet, or the CSV file is newer (it was edited or written
+    by an older job), the CSV is imported: it is parsed, typed and converted to Parquet so that
+    the following reads are fast.
+
+    Parameters:
+    csv_path (str): Path of the dataset in CSV format.
+    dtypes (dict): Column types applied when importing the CSV (default: None).
+    columns (list): Only read these columns (default: None, all columns).
+
+    Returns:
+    DataFrame: The dataset.
+    """
+    parquet_path = columnar_path(csv_path)
+    if _is_imported(csv_path):
+        return pd.read_parquet(parquet_path, columns=columns)
+
+    df = _apply_dtypes(pd.read_csv(csv_path), dtypes)
+    write_dataset(df, csv_path)
+    return df[columns] if columns is not None else df
+
+
+def write_dataset(df, csv_path: str, dtypes: dict = None):
+    """
+    Writes a dataset to its Parquet file.
+
+    The file is written to a temporary path and then renamed, so readers never see a
+    partially written dataset.
+
+    Parameters:
+    df (DataFrame): The dataset.
+    csv_path (str): Path of the dataset in CSV format.
+    dtypes (dict): Column types applied before writing (default: None).
+    """
+    df = _apply_dtypes(df.copy(), dtypes) if dtypes else df
+    _write_parquet(df, columnar_path(csv_path))
+
+
+def iter_dataset(csv_path: str, dtypes: dict = None, columns: list = None, batch_size: int = 65536):
+    """
+    Reads a dataset from its Parquet file in batches, so that it never has to fit in memory at once.
+
+    Parameters:
+    csv_path (str): Path of the dataset in CSV format.
+    dtypes (dict): Column types applied when importing the CSV (default: None).
+    columns (list): Only read these columns (default: None, all columns).
+    batch_size (int): Maximum number of rows per batch (default: 65536).
+
+    Returns:
+    generator: DataFrames of at most `batch_size` rows.
+    """
+    if not _is_imported(csv_path):
+        read_dataset(csv_path, dtypes)
+    parquet_file = pq.ParquetFile(columnar_path(csv_path))
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+class DatasetWriter:
+    """
+    Writes a dataset to its Parquet file chunk by chunk.
+
+    Chunks are appended to a temporary file as Parquet row groups, and the file replaces the
+    dataset only when the writer is closed without error, so readers never see a partial dataset
+    and only one chunk has to be held in memory at a time.
+    """
+
+    def __init__(self, csv_path: str, dtypes: dict = None):
+        self.dtypes = dtypes
+        self.parquet_path = columnar_path(csv_path)
+        self.tmp_path = None
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df):
+        """
+        Appends a chunk of rows; every chunk must have the same columns as the first one.
+
+        Parameters:
+        df (DataFrame): The rows to append.
+        """
+        df = _apply_dtypes(df.copy(), self.dtypes)
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self.tmp_path = _temp_path(self.parquet_path)
+            self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        """
+        Finishes the file and replaces the dataset with it.
+        """
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self.tmp_path, self.parquet_path)
+
+    def abort(self):
+        """
+        Discards the rows written so far, the dataset is left unchanged.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def dataset_mtime(csv_path: str):
+    """
+    Returns the last modification time of a dataset, whichever format it was last written in.
+
+    Parameters:
+    csv_path (str): Path of the dataset in CSV format.
+
+    Returns:
+    float: Modification time, or None if the dataset does not exist.
+    """
+    mtimes = [os.path.getmtime(path) for path in (csv_path, columnar_path(csv_path)) if os.path.exists(path)]
+    return max(mtimes) if mtimes else None
+
+
+class SegmentStore:
+    """
+    Append-only, segment-based storage of a dataset keyed by `key_columns`.
+
+    The dataset lives in a directory next to its CSV: `base.parquet` is a deduplicated
+    snapshot and every `append` writes only the new rows as a `delta-<n>.parquet` segment.
+    The latest state is the base with the rows overridden by the deltas (the last write of a
+    key wins), so reading it only deduplicates the small deltas, never the full history.
+    Deltas are folded into the base by `compact`, which runs automatically once there are
+    more than `max_segments` of them.
+
+    The dataset is shared by several processes (the API and the recommendation jobs), so the
+    writes take an exclusive lock on `<name>_segments/.lock` and the reads a shared one: two
+    appends never pick the same delta number, and a read never sees a compaction half done.
+    """
+
+    def __init__(self, csv_path: str, key_columns: list, dtypes: dict = None, max_segments: int = 16):
+        self.csv_path = csv_path
+        self.key_columns = key_columns
+        self.dtypes = dtypes
+        self.max_segments = max_segments
+        self.directory = os.path.splitext(csv_path)[0] + "_segments"
+        self.base_path = os.path.join(self.directory, "base.parquet")
+        self.lock_path = os.path.join(self.directory, ".lock")
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        # The lock is released when the lockfile is closed
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _delta_paths(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = [name for name in os.listdir(self.directory)
+                 if name.startswith("delta-") and name.endswith(".parquet")]
+        return [os.path.join(self.directory, name) for name in sorted(names)]
+
+    def _ensure_base(self):
+        # The first use imports the existing dataset (Parquet or CSV) as the base snapshot
+        if os.path.exists(self.base_path):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        df = read_dataset(self.csv_path, self.dtypes)
+        df = df.drop_duplicates(subset=self.key_columns, keep="last")
+        self._write(df, self.base_path)
+
+    def _write(self, df, path):
+        _write_parquet(_apply_dtypes(df.copy(), self.dtypes), path)
+
+    def append(self, df):
+        """
+        Appends new or updated rows as a new delta segment.
+
+        Parameters:
+        df (DataFrame): The rows to append.
+        """
+        if df.empty:
+            return
+        with self._locked(exclusive=True):
+            self._ensure_base()
+            delta_paths = self._delta_paths()
+            seq = int(os.path.basename(delta_paths[-1])[6:-8]) + 1 if delta_paths else 1
+            self._write(df, os.path.join(self.directory, f"delta-{seq:08d}.parquet"))
+
+            if len(delta_paths) + 1 > self.max_segments:
+                self._compact()
+
+    def read(self, columns: list = None):
+        """
+        Reads the latest state of the dataset.
+
+        Parameters:
+        columns (list): Only read these columns (default: None, all columns).
+
+        Returns:
+        DataFrame: The dataset, base rows first followed by the rows of the deltas.
+        """
+        if not os.path.exists(self.base_path):
+            with self._locked(exclusive=True):
+                self._ensure_base()
+        with self._locked(exclusive=False):
+            return self._read(columns)
+
+    def _read(self, columns: list = None):
+        read_columns = None if columns is None else list(dict.fromkeys(self.key_columns + columns))
+        base = pd.read_parquet(self.base_path, columns=read_columns)
+        delta_paths = self._delta_paths()
+        if delta_paths:
+            deltas = pd.concat([pd.read_parquet(path, columns=read_columns) for path in delta_paths],
+                               ignore_index=True)
+            deltas = deltas.drop_duplicates(subset=self.key_columns, keep="last")
+            overridden = pd.MultiIndex.from_frame(base[self.key_columns]).isin(
+                pd.MultiIndex.from_frame(deltas[self.key_columns]))
+            base = pd.concat([base[~overridden], deltas], ignore_index=True)
+            base = _apply_dtypes(base, self.dtypes)
+        return base[columns] if columns is not None else base
+
+    def compact(self):
+        """
+        Folds the delta segments into a new base snapshot and removes them.
+        """
+        with self._locked(exclusive=True):
+            self._ensure_base()
+            self._compact()
+
+    def _compact(self):
+        delta_paths = self._delta_paths()
+        if not delta_paths:
+            return
+        self._write(self._read(), self.base_path)
+        for path in delta_paths:
+            os.remove(path)
+
+    def mtime(self):
+        """
+        Returns the last time the dataset was written, or None if it does not exist yet.
+        """
+        if not os.path.isdir(self.directory):
+            return dataset_mtime(self.csv_path)
+        with self._locked(exclusive=False):
+            paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                     if name != ".lock"]
+            return max((os.path.getmtime(path) for path in paths), default=None)
+
+
+def ratings_store(csv_path: str):
+    """
+    Returns the segment store of the ratings, keyed by user and blog.
+    """
+    return SegmentStore(csv_path, ["userId", "blog_id"], RATINGS_DTYPES)
+
+
+def blog_data_store(csv_path: str):
+    """
+    Returns the segment store of the blog data, keyed by blog.
+    """
+    return SegmentStore(csv_path, ["blog_id"], BLOG_DATA_DTYPES)
@@ -0,0 +1,253 @@
+import numpy as np
+import scipy.sparse as sp
+
+# Number of query rows scored at once
+CHUNK_SIZE = 256
+
+
+def _sorted_top_k(candidates, candidate_scores, top_k):
+    """
+    Keeps the top_k best scoring candidates of every row, sorted by decreasing score.
+
+    Candidates with a negative score (excluded or padding) are returned as -1 with a score of 0.
+    """
+    n_rows, n_candidates = candidate_scores.shape
+    neighbours = np.full((n_rows, top_k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, top_k), dtype=np.float32)
+    k = min(top_k, n_candidates)
+    if k == 0:
+        return neighbours, scores
+
+    top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(candidate_scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top = np.take_along_axis(np.take_along_axis(candidates, top, axis=1), order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    top[top_scores < 0] = -1
+    top_scores[top_scores < 0] = 0
+    neighbours[:, :k] = top
+    scores[:, :k] = top_scores
+    return neighbours, scores
+
+
+class ExactSearch:
+    """
+    Brute-force cosine similarity search over the whole corpus.
+
+    Every query is scored against every blog, so this is the reference for recall but its
+    cost grows linearly with the corpus for each query (quadratically for a full build).
+    """
+    name = 'exact'
+
+    def fit(self, vectors):
+        self.vectors = vectors.tocsr()
+        return self
+
+    def add(self, vectors, n_old: int):
+        self.vectors = vectors.tocsr()
+
+    def query(self, query_vectors, top_k: int, offset: int = None):
+        """
+        Returns the top_k most similar blogs of every query.
+
+        Parameters:
+        query_vectors (scipy.sparse.csr_matrix): L2-normalized vectors of the query blogs.
+        top_k (int): Number of neighbours to return per query.
+        offset (int): Corpus row of the first query, used to exclude each blog from
+                      its own neighbours (default: None, nothing excluded).
+
+        Returns:
+        tuple: (neighbours, scores) arrays of shape (n_queries, top_k).
+        """
+        n_queries = query_vectors.shape[0]
+        neighbours = np.full((n_queries, top_k), -1, dtype=np.int32)
+        scores = np.zeros((n_queries, top_k), dtype=np.float32)
+        candidates = np.arange(self.vectors.shape[0], dtype=np.int32)[None, :]
+
+        for start in range(0, n_queries, CHUNK_SIZE):
+            end = min(start + CHUNK_SIZE, n_queries)
+            # Scored from the corpus side so that the corpus is not transposed for each query
+            sims = (self.vectors @ query_vectors[start:end].T).T.toarray().astype(np.float32)
+
+            # A blog is never its own neighbour
+            if offset is not None:
+                rows = np.arange(end - start)
+                sims[rows, rows + offset + start] = -1
+
+            neighbours[start:end], scores[start:end] = _sorted_top_k(
+                np.broadcast_to(candidates, sims.shape), sims, top_k)
+
+        return neighbours, scores
+
+    def save(self, file):
+        pass
+
+
+class IVFSearch:
+    """
+    Inverted-file (cluster-pruned) approximate cosine similarity search.
+
+    The corpus is partitioned with spherical k-means into `n_lists` clusters. A query is only
+    scored against the members of its `n_probe` closest clusters: raising `n_probe` trades
+    query latency for recall, and n_probe == n_lists is equivalent to the exact search.
+    """
+    name = 'ivf'
+
+    def __init__(self, n_lists: int = None, n_probe: int = 8, n_iter: int = 10, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+
+    def fit(self, vectors):
+        """
+        Clusters the corpus. The number of lists defaults to sqrt(n_blogs).
+        """
+        # Only needed to build the index, not to serve it
+        from sklearn.preprocessing import normalize
+
+        self.vectors = vectors.tocsr()
+        n_blogs = self.vectors.shape[0]
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(n_blogs))), n_blogs)
+        rng = np.random.default_rng(self.seed)
+
+        centroids = self.vectors[rng.choice(n_blogs, n_lists, replace=False)]
+        for _ in range(self.n_iter):
+            labels = self._assign(self.vectors, centroids)
+            membership = sp.csr_matrix((np.ones(n_blogs, dtype=np.float32), (labels, np.arange(n_blogs))),
+                                       shape=(n_lists, n_blogs))
+            new_centroids = normalize(membership @ self.vectors, norm='l2').tocsr()
+
+            # Empty clusters keep their previous centroid
+            empty = np.flatnonzero(np.bincount(labels, minlength=n_lists) == 0)
+            if len(empty):
+                keep = np.ones(n_lists, dtype=bool)
+                keep[empty] = False
+                new_centroids = sp.vstack([new_centroids[i] if keep[i] else centroids[i]
+                                           for i in range(n_lists)], format='csr')
+            centroids = new_centroids
+
+        self.centroids = centroids
+        self._set_labels(self._assign(self.vectors, centroids))
+        return self
+
+    def add(self, vectors, n_old: int):
+        """
+        Appends the rows from n_old onwards to their closest clusters without reclustering.
+        """
+        self.vectors = vectors.tocsr()
+        self.centroids = sp.csr_matrix((self.centroids.data, self.centroids.indices, self.centroids.indptr),
+                                       shape=(self.centroids.shape[0], self.vectors.shape[1]))
+        new_labels = self._assign(self.vectors[n_old:], self.centroids)
+        self._set_labels(np.concatenate([self.labels, new_labels]))
+
+    def query(self, query_vectors, top_k: int, offset: int = None):
+        """
+        Returns the (approximate) top_k most similar blogs of every query.
+
+        Parameters:
+        query_vectors (scipy.sparse.csr_matrix): L2-normalized vectors of the query blogs.
+        top_k (int): Number of neighbours to return per query.
+        offset (int): Corpus row of the first query, used to exclude each blog from
+                      its own neighbours (default: None, nothing excluded).
+
+        Returns:
+        tuple: (neighbours, scores) arrays of shape (n_queries, top_k).
+        """
+        query_vectors = query_vectors.tocsr()
+        n_queries = query_vectors.shape[0]
+        neighbours = np.full((n_queries, top_k), -1, dtype=np.int32)
+        scores = np.full((n_queries, top_k), -1, dtype=np.float32)
+        probes = self._probe(query_vectors)
+
+        # Group the (query, list) pairs by list so that each list is scored once
+        query_rows = np.repeat(np.arange(n_queries), probes.shape[1])
+        lists = probes.ravel()
+        order = np.argsort(lists, kind='stable')
+        query_rows, lists = query_rows[order], lists[order]
+        list_ids, starts = np.unique(lists, return_index=True)
+        ends = np.append(starts[1:], len(lists))
+
+        for list_id, start, end in zip(list_ids, starts, ends):
+            members = self.members[self.list_starts[list_id]:self.list_starts[list_id + 1]]
+            if len(members) == 0:
+                continue
+            rows = query_rows[start:end]
+            sims = (query_vectors[rows] @ self.vectors[members].T).toarray().astype(np.float32)
+            if offset is not None:
+                sims[members[None, :] == (rows + offset)[:, None]] = -1
+
+            candidates = np.hstack([neighbours[rows], np.broadcast_to(members, sims.shape)])
+            candidate_scores = np.hstack([scores[rows], sims])
+            best, best_scores = _sorted_top_k(candidates, candidate_scores, top_k)
+            neighbours[rows] = best
+            scores[rows] = np.where(best >= 0, best_scores, -1)
+
+        scores[neighbours < 0] = 0
+        return neighbours, scores
+
+    def save(self, file):
+        np.savez(file,
+                 n_probe=self.n_probe,
+                 labels=self.labels,
+                 centroids_data=self.centroids.data,
+                 centroids_indices=self.centroids.indices,
+                 centroids_indptr=self.centroids.indptr,
+                 centroids_shape=self.centroids.shape)
+
+    @classmethod
+    def load(cls, path: str, vectors, n_probe: int = None):
+        with np.load(path) as data:
+            search = cls(n_probe=int(n_probe or data['n_probe']))
+            search.centroids = sp.csr_matrix(
+                (data['centroids_data'], data['centroids_indices'], data['centroids_indptr']),
+                shape=tuple(data['centroids_shape']))
+            labels = data['labels']
+        search.vectors = vectors.tocsr()
+        search._set_labels(labels)
+        return search
+
+    def _set_labels(self, labels):
+        # Members of list i are members[list_starts[i]:list_starts[i + 1]]
+        self.labels = labels.astype(np.int32)
+        self.members = np.argsort(self.labels, kind='stable').astype(np.int32)
+        counts = np.bincount(self.labels, minlength=self.centroids.shape[0])
+        self.list_starts = np.concatenate([[0], np.cumsum(counts)])
+
+    def _probe(self, query_vectors):
+        n_probe = min(self.n_probe, self.centroids.shape[0])
+        probes = np.empty((query_vectors.shape[0], n_probe), dtype=np.int32)
+        centroids_t = self.centroids.T.tocsc()
+        for start in range(0, query_vectors.shape[0], CHUNK_SIZE * 16):
+            end = min(start + CHUNK_SIZE * 16, query_vectors.shape[0])
+            sims = (query_vectors[start:end] @ centroids_t).toarray()
+            probes[start:end] = np.argpartition(-sims, n_probe - 1, axis=1)[:, :n_probe]
+        return probes
+
+    @staticmethod
+    def _assign(vectors, centroids):
+        labels = np.empty(vectors.shape[0], dtype=np.int32)
+        centroids_t = centroids.T.tocsc()
+        for start in range(0, vectors.shape[0], CHUNK_SIZE * 16):
+            end = min(start + CHUNK_SIZE * 16, vectors.shape[0])
+            labels[start:end] = np.asarray((vectors[start:end] @ centroids_t).toarray().argmax(axis=1)).ravel()
+        return labels
+
+
+def make_search(name: str = 'exact', n_probe: int = 8):
+    """
+    Returns an unfitted nearest-neighbour backend.
+
+    Parameters:
+    name (str): 'exact' for brute-force search or 'ivf' for the approximate inverted-file search.
+    n_probe (int): Number of clusters probed per query by the 'ivf' backend (default: 8).
+
+    Returns:
+    ExactSearch or IVFSearch: The backend.
+    """
+    if name == 'exact':
+        return ExactSearch()
+    if name == 'ivf':
+        return IVFSearch(n_probe=n_probe)
+    raise ValueError(f"Unknown similarity backend: {name}")
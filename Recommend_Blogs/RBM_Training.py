@@ -0,0 +1,226 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Training device and TensorFlow thread pools; the batch hosts are CPU-only so the CPU is the default.
+# A thread count of 0 lets TensorFlow pick one thread per core.
+RBM_DEVICE = os.environ.get('RBM_DEVICE', 'cpu')
+RBM_INTRA_OP_THREADS = int(os.environ.get('RBM_INTRA_OP_THREADS', 0))
+RBM_INTER_OP_THREADS = int(os.environ.get('RBM_INTER_OP_THREADS', 0))
+
+# Model hyperparameters
+RBM_HIDDEN_UNITS = int(os.environ.get('RBM_HIDDEN_UNITS', 1200))
+RBM_MINIBATCH_SIZE = int(os.environ.get('RBM_MINIBATCH_SIZE', 350))
+RBM_KEEP_PROB = 0.7
+
+# Number of users scored at once; bounds the memory used by the dense score matrix
+RBM_SCORING_CHUNK_SIZE = int(os.environ.get('RBM_SCORING_CHUNK_SIZE', 1024))
+
+
+def configure_tensorflow(device: str = RBM_DEVICE, intra_op_threads: int = RBM_INTRA_OP_THREADS,
+                         inter_op_threads: int = RBM_INTER_OP_THREADS):
+    """
+    Configures the TensorFlow device and thread pools used to train the RBM.
+
+    The thread counts are also exported as environment variables, which is the only way to
+    apply them to the session created by the RBM when TensorFlow is already initialised.
+
+    Parameters:
+    device (str): 'cpu' or 'gpu'; 'gpu' falls back to the CPU when no GPU is available.
+    intra_op_threads (int): Threads used inside a single operation, e.g. a matrix product (0: default).
+    inter_op_threads (int): Operations run in parallel (0: default).
+
+    Returns:
+    str: The TensorFlow device name to train on.
+    """
+    if intra_op_threads:
+        os.environ['TF_NUM_INTRAOP_THREADS'] = str(intra_op_threads)
+        os.environ['OMP_NUM_THREADS'] = str(intra_op_threads)
+    if inter_op_threads:
+        os.environ['TF_NUM_INTEROP_THREADS'] = str(inter_op_threads)
+
+    import tensorflow as tf
+
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError:
+        # The runtime is already initialised; the environment variables still apply to new sessions
+        pass
+
+    gpus = tf.config.list_physical_devices('GPU')
+    if device == 'gpu' and gpus:
+        try:
+            tf.config.experimental.set_memory_growth(gpus[0], True)
+        except RuntimeError:
+            pass
+        return '/gpu:0'
+
+    # Hide the GPUs so that no operation is silently placed on them
+    try:
+        tf.config.set_visible_devices([], 'GPU')
+    except RuntimeError:
+        pass
+    return '/cpu:0'
+
+
+def sparse_affinity_matrix(affinity_matrix, ratings_df):
+    """
+    Builds the user/blog rating matrix as a CSR matrix.
+
+    Uses the user and item indices of the AffinityMatrix, so rows and columns match the dense
+    matrix returned by `gen_affinity_matrix` and its mapping functions keep working, but only the
+    non-zero ratings are stored.
+
+    Parameters:
+    affinity_matrix (AffinityMatrix): The affinity matrix of the ratings.
+    ratings_df (DataFrame): Ratings with userId, blog_id and ratings columns.
+
+    Returns:
+    csr_matrix: float32 matrix of shape (number of users, number of blogs).
+    """
+    # Index the users and items without materialising the dense matrix
+    affinity_matrix._gen_index()
+
+    rows = ratings_df['userId'].map(affinity_matrix.map_users).to_numpy()
+    cols = ratings_df['blog_id'].map(affinity_matrix.map_items).to_numpy()
+    ratings = ratings_df['ratings'].to_numpy(dtype=np.float32)
+    shape = (len(affinity_matrix.map_users), len(affinity_matrix.map_items))
+    return sparse.csr_matrix((ratings, (rows, cols)), shape=shape, dtype=np.float32)
+
+
+def sparse_stratified_split(X, ratio: float = 0.75, seed: int = 42):
+    """
+    Splits the ratings of every user into training and test ratings, without densifying the matrix.
+
+    Same split as `numpy_stratified_split` of the recommenders package for the same seed: the
+    test set of each user is drawn from their rated blogs in column order.
+
+    Parameters:
+    X (csr_matrix or ndarray): Rating matrix.
+    ratio (float): Share of the ratings of each user kept for training (default: 0.75).
+    seed (int): Random seed (default: 42).
+
+    Returns:
+    tuple: The training and test rating matrices, as CSR matrices of the shape of X.
+    """
+    X = sparse.csr_matrix(X, dtype=np.float32)
+    X.sort_indices()
+    np.random.seed(seed)
+    test_cut = int((1 - ratio) * 100)
+    rated = np.diff(X.indptr)
+    n_test = np.around((rated * test_cut) / 100).astype(int)
+
+    # Position of each test rating in X.data
+    test = np.zeros(X.nnz, dtype=bool)
+    for user in range(X.shape[0]):
+        positions = np.arange(X.indptr[user], X.indptr[user + 1])
+        test[np.random.choice(positions, n_test[user], replace=False)] = True
+
+    X_train, X_test = X.copy(), X.copy()
+    X_train.data[test] = 0
+    X_test.data[~test] = 0
+    X_train.eliminate_zeros()
+    X_test.eliminate_zeros()
+    return X_train, X_test
+
+
+def dense_rows(X, rows=None):
+    """
+    Returns rows of a sparse or dense rating matrix as a dense float32 array, the input format of the RBM.
+
+    Parameters:
+    X (csr_matrix or ndarray): Rating matrix.
+    rows (ndarray): Indices of the rows to return (default: None, all rows).
+
+    Returns:
+    ndarray: The dense rows.
+    """
+    if rows is not None:
+        X = X[rows]
+    if sparse.issparse(X):
+        return X.toarray()
+    return np.asarray(X, dtype=np.float32)
+
+
+def possible_ratings(X):
+    """
+    Returns the distinct non-zero ratings of a sparse or dense rating matrix, or of an array of ratings.
+    """
+    values = X.data if sparse.issparse(X) else X
+    return np.setdiff1d(np.unique(values), np.array([0]))
+
+
+def make_rbm(X, visible_units: int, training_epoch: int, hidden_units: int = RBM_HIDDEN_UNITS,
+             minibatch_size: int = RBM_MINIBATCH_SIZE, n_rows: int = None, with_metrics: bool = True):
+    """
+    Creates the RBM model.
+
+    Parameters:
+    X (csr_matrix or ndarray): Rating matrix or rating values, used to find the possible ratings.
+    visible_units (int): Number of blogs.
+    training_epoch (int): Number of epochs run by `fit`.
+    hidden_units (int): Number of hidden units (default: RBM_HIDDEN_UNITS).
+    minibatch_size (int): Minibatch size (default: RBM_MINIBATCH_SIZE).
+    n_rows (int): Number of training rows; the minibatch is never larger (default: None).
+    with_metrics (bool): Whether to compute the training metrics (default: True).
+
+    Returns:
+    RBM: The model.
+    """
+    from recommenders.models.rbm.rbm import RBM
+
+    if n_rows is not None:
+        minibatch_size = min(minibatch_size, n_rows)
+    return RBM(
+        possible_ratings=possible_ratings(X),
+        visible_units=visible_units,
+        hidden_units=hidden_units,
+        training_epoch=training_epoch,
+        minibatch_size=minibatch_size,
+        keep_prob=RBM_KEEP_PROB,
+        with_metrics=with_metrics
+    )
+
+
+def top_k_chunks(model, X, X_seen, user_ids, item_ids, k: int, chunk_size: int = RBM_SCORING_CHUNK_SIZE):
+    """
+    Scores the users in blocks of `chunk_size` rows and yields their top-K recommendations.
+
+    Only one block of scores is dense in memory at a time, whatever the number of users.
+
+    Parameters:
+    model (RBM): The trained model.
+    X (csr_matrix or ndarray): Rating matrix of the users to score.
+    X_seen (csr_matrix or ndarray): Training ratings of the same users, whose blogs are not recommended.
+    user_ids (ndarray): User ID of each row of X.
+    item_ids (ndarray): Blog ID of each column of X.
+    k (int): Number of recommendations per user.
+    chunk_size (int): Number of users scored at once (default: RBM_SCORING_CHUNK_SIZE).
+
+    Returns:
+    generator: DataFrames with userId, blog_id and prediction columns.
+    """
+    k = min(k, X.shape[1])
+    for start in range(0, X.shape[0], chunk_size):
+        rows = np.arange(start, min(start + chunk_size, X.shape[0]))
+        # The RBM zeroes the scores of `seen_mask`, which `fit` sets for the whole training matrix;
+        # it must be the mask of the users of this block
+        model.seen_mask = dense_rows(X_seen, rows) != 0
+        scores = model.recommend_k_items(dense_rows(X, rows), k)
+
+        # Select the K best blogs of every user without sorting the whole row
+        top_items = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top_items, axis=1)
+
+        # Blogs outside the top K (and seen blogs) have a zero score, skip them like map_back_sparse does
+        recommended = top_scores > 0
+        top_rows = np.broadcast_to(rows[:, None], top_items.shape)
+        yield pd.DataFrame({
+            "userId": user_ids[top_rows[recommended]],
+            "blog_id": item_ids[top_items[recommended]],
+            "prediction": top_scores[recommended],
+        })
@@ -0,0 +1,169 @@
+"""
+Background worker that keeps the RBM recommendations up to date.
+
+The worker runs in its own process, separate from the API: it has its own database connection,
+pulls the ratings added since its watermark, retrains and rescores the RBM (see Using_RBM.py) and
+publishes the recommendations by atomically replacing the recommendations Parquet file, which the
+API reloads when it changes. A lockfile guarantees that only one run happens at a time, even when
+several workers or a manual run are started.
+
+Usage:
+python -m Recommend_Blogs.Recommendation_Worker            # run every RECOMMENDATION_WORKER_INTERVAL seconds
+python -m Recommend_Blogs.Recommendation_Worker --once     # run once and exit
+"""
+import argparse
+import fcntl
+import os
+import time
+from datetime import datetime, timedelta
+import mysql.connector as SqlConnector
+from pytz import timezone
+
+# MySQL connection settings, the same environment variables as the API
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "HostURL"),
+    "user": os.environ.get("DB_USER", "UserName"),
+    "password": os.environ.get("DB_PASSWORD", "Password"),
+    "database": os.environ.get("DB_NAME", "blog_recommendation_system"),
+}
+
+# Seconds between two runs, and the niceness of the worker so that it yields the CPU to the API
+RECOMMENDATION_WORKER_INTERVAL = float(os.environ.get("RECOMMENDATION_WORKER_INTERVAL", 3600))
+RECOMMENDATION_WORKER_NICE = int(os.environ.get("RECOMMENDATION_WORKER_NICE", 10))
+
+# Seconds before the watermark from which the ratings are fetched again. A rating is timestamped
+# when its request arrives but committed later, so it may be committed after a run whose window
+# already ended past its timestamp.
+RECOMMENDATION_WORKER_FETCH_OVERLAP = float(os.environ.get("RECOMMENDATION_WORKER_FETCH_OVERLAP", 300))
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+lock_path = os.path.join(base_path, "RecommendedBlogs/worker.lock")
+# Time up to which the ratings have been included in the published recommendations
+watermark_path = os.path.join(base_path, "RecommendedBlogs/watermark.txt")
+
+WATERMARK_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def acquire_lock(path: str = lock_path):
+    """
+    Takes the worker lock without waiting.
+
+    Parameters:
+    path (str): Path of the lockfile.
+
+    Returns:
+    file: The open lockfile, which holds the lock until it is closed, or None if another run holds it.
+    """
+    lock_file = open(path, "a+")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    return lock_file
+
+
+def read_watermark():
+    """
+    Returns the watermark, falling back to the timestamp of the current recommendations.
+
+    Returns:
+    datetime: Time up to which the ratings are already included in the recommendations.
+    """
+    if os.path.exists(watermark_path):
+        with open(watermark_path) as f:
+            return datetime.strptime(f.read().strip(), WATERMARK_FORMAT)
+
+    from Recommend_Blogs.Using_RBM import last_recommendation_time
+    return last_recommendation_time()
+
+
+def write_watermark(watermark: datetime):
+    """
+    Stores the watermark; the file is replaced atomically.
+
+    Parameters:
+    watermark (datetime): Time up to which the ratings are included in the recommendations.
+    """
+    tmp_path = watermark_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(watermark.strftime(WATERMARK_FORMAT))
+    os.replace(tmp_path, watermark_path)
+
+
+def current_time():
+    # Ratings are timestamped in 'Asia/Kolkata' time by the API
+    curr_time = datetime.now(timezone("Asia/Kolkata")).strftime(WATERMARK_FORMAT)
+    return datetime.strptime(curr_time, WATERMARK_FORMAT)
+
+
+def run_once():
+    """
+    Updates the recommendations with the ratings added since the watermark, unless another run is in progress.
+
+    Returns:
+    bool: False if the run was skipped because another run holds the lock.
+    """
+    lock_file = acquire_lock()
+    if lock_file is None:
+        print("Another recommendation run is in progress, skipping")
+        return False
+
+    try:
+        # TensorFlow and the recommenders package are only imported by the worker process
+        from Recommend_Blogs.Using_RBM import drop_known_ratings, fetch_new_ratings, update_recommendations
+
+        since = read_watermark()
+        until = current_time()
+
+        db = SqlConnector.connect(**DB_CONFIG)
+        try:
+            ratings_df_new = fetch_new_ratings(db, since - timedelta(seconds=RECOMMENDATION_WORKER_FETCH_OVERLAP),
+                                               until)
+        finally:
+            db.close()
+        # The overlap re-reads ratings of the previous runs, only the new or changed ones are kept
+        ratings_df_new = drop_known_ratings(ratings_df_new)
+
+        if ratings_df_new.empty:
+            print(f"No new ratings since {since}")
+        else:
+            print(f"{len(ratings_df_new)} new ratings since {since}")
+            update_recommendations(ratings_df_new, until)
+
+        # Only move the watermark once the recommendations are published
+        write_watermark(until)
+        return True
+    finally:
+        lock_file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--once', action='store_true', help="run once and exit")
+    parser.add_argument('--interval', type=float, default=RECOMMENDATION_WORKER_INTERVAL)
+    args = parser.parse_args(argv)
+
+    if RECOMMENDATION_WORKER_NICE:
+        os.nice(RECOMMENDATION_WORKER_NICE)
+
+    if args.once:
+        run_once()
+        return
+
+    while True:
+        start = time.monotonic()
+        try:
+            run_once()
+        except Exception as e:
+            # Keep the schedule going, the next run retries from the same watermark
+            print(f"Recommendation run failed: {e}")
+        time.sleep(max(0.0, args.interval - (time.monotonic() - start)))
+
+
+if __name__ == '__main__':
+    main()
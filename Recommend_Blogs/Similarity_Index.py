@@ -0,0 +1,463 @@
+import os
+import pathlib
+import threading
+import time
+import zipfile
+import numpy as np
+import scipy.sparse as sp
+from Recommend_Blogs.Nearest_Neighbours import IVFSearch, make_search
+from Recommend_Blogs.Data_Store import blog_data_store, write_atomically
+
+# Paths of the blog corpus and of the persisted similarity index
+data_dir = os.path.join(pathlib.Path(__file__).parent, "BlogData")
+data_file = os.path.join(data_dir, "blog_data.csv")
+index_file = os.path.join(data_dir, "similarity_index.npz")
+backend_file = os.path.join(data_dir, "similarity_ivf.npz")
+
+# Number of neighbours kept per blog and minimum score for a blog to be recommended
+TOP_K = 50
+SIMILARITY_THRESHOLD = 0.5
+
+# Nearest-neighbour backend used to build the table: 'exact' or 'ivf' (approximate).
+# SIMILARITY_N_PROBE is the recall/latency knob of the 'ivf' backend.
+SIMILARITY_BACKEND = os.environ.get('SIMILARITY_BACKEND', 'exact')
+SIMILARITY_N_PROBE = int(os.environ.get('SIMILARITY_N_PROBE', 8))
+
+# Minimum number of seconds between two saves of an index extended with new blogs. Blogs added
+# since the last save are re-added from the blog data when the index is loaded.
+SIMILARITY_SAVE_INTERVAL = float(os.environ.get('SIMILARITY_SAVE_INTERVAL', 600))
+
+
+def _with_capacity(array, capacity: int):
+    # Copy of `array` in a buffer of `capacity` rows, the extra rows are uninitialized
+    grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _grown_capacity(capacity: int, needed: int):
+    # Buffers double when full, so that appending is amortized O(appended rows)
+    return max(needed, 2 * capacity, 16)
+
+
+class _RowStore:
+    """
+    Rows of a CSR matrix kept in preallocated buffers, so that appending rows does not copy the
+    existing ones. `matrix` returns a CSR view of the rows, without copying them.
+    """
+
+    def __init__(self, matrix):
+        matrix = matrix.tocsr()
+        self.n_rows = matrix.shape[0]
+        self.nnz = matrix.nnz
+        self.data = matrix.data[:self.nnz].astype(np.float32)
+        self.indices = matrix.indices[:self.nnz].astype(np.int32)
+        self.indptr = matrix.indptr.astype(np.int32)
+
+    def append(self, rows):
+        rows = rows.tocsr()
+        nnz = self.nnz + rows.nnz
+        if nnz > len(self.data):
+            capacity = _grown_capacity(len(self.data), nnz)
+            self.data = _with_capacity(self.data[:self.nnz], capacity)
+            self.indices = _with_capacity(self.indices[:self.nnz], capacity)
+        n_rows = self.n_rows + rows.shape[0]
+        if n_rows + 1 > len(self.indptr):
+            self.indptr = _with_capacity(self.indptr[:self.n_rows + 1], _grown_capacity(len(self.indptr), n_rows + 1))
+
+        self.data[self.nnz:nnz] = rows.data
+        self.indices[self.nnz:nnz] = rows.indices
+        self.indptr[self.n_rows + 1:n_rows + 1] = rows.indptr[1:] + self.nnz
+        self.n_rows, self.nnz = n_rows, nnz
+
+    def matrix(self, n_rows: int, n_cols: int):
+        nnz = self.indptr[n_rows]
+        return sp.csr_matrix((self.data[:nnz], self.indices[:nnz], self.indptr[:n_rows + 1]),
+                             shape=(n_rows, n_cols), copy=False)
+
+
+class SimilarityIndex:
+    """
+    Top-K cosine similarity neighbours of every blog in the corpus.
+
+    The neighbour table is stored as two fixed-width arrays of shape (n_blogs, top_k):
+    `neighbours` holds row positions of the most similar blogs (-1 when there are fewer
+    than top_k other blogs) and `scores` the matching cosine similarities. The nearest-neighbour
+    `search` backend is only used when the table is built or extended.
+
+    The table, the blog IDs and the vectors are kept in buffers with spare capacity, so adding
+    blogs appends to them instead of copying the corpus. Lookups may run while blogs are added:
+    the new and updated rows are computed first and written under a lock that lookups take
+    just long enough to copy one row.
+    """
+
+    def __init__(self, blog_ids, vocabulary, vectors, neighbours, scores, search=None):
+        self._size = len(blog_ids)
+        self._blog_ids = np.asarray(blog_ids, dtype=np.int64)
+        self._neighbours = np.asarray(neighbours, dtype=np.int32)
+        self._scores = np.asarray(scores, dtype=np.float32)
+        self._vectors = _RowStore(vectors)
+        self.vocabulary = list(vocabulary)
+        self.term_positions = {term: col for col, term in enumerate(self.vocabulary)}
+        self.positions = {blog_id: pos for pos, blog_id in enumerate(self._blog_ids.tolist())}
+        self.search = search if search is not None else make_search('exact').fit(self.vectors)
+        # Serializes the writers (add_blogs and save)
+        self._write_lock = threading.Lock()
+        # Taken by lookups and by the writes of add_blogs to the table
+        self._table_lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    @property
+    def blog_ids(self):
+        return self._blog_ids[:self._size]
+
+    @property
+    def neighbours(self):
+        return self._neighbours[:self._size]
+
+    @property
+    def scores(self):
+        return self._scores[:self._size]
+
+    @property
+    def vectors(self):
+        return self._vectors.matrix(self._size, len(self.vocabulary))
+
+    @property
+    def top_k(self):
+        return self._neighbours.shape[1]
+
+    def similar_blogs(self, blog_id: int, threshold: float = SIMILARITY_THRESHOLD):
+        """
+        Returns the IDs of the blogs whose similarity with the given blog is above the threshold.
+
+        Parameters:
+        blog_id (int): ID of the blog.
+        threshold (float): Minimum cosine similarity (default: SIMILARITY_THRESHOLD).
+
+        Returns:
+        numpy.ndarray: IDs of the similar blogs, most similar first.
+        """
+        with self._table_lock:
+            pos = self.positions.get(blog_id)
+            if pos is None:
+                return np.empty(0, dtype=np.int64)
+            neighbours = self._neighbours[pos].copy()
+            scores = self._scores[pos].copy()
+            blog_ids = self._blog_ids
+
+        mask = (neighbours >= 0) & (scores > threshold)
+        return blog_ids[neighbours[mask]]
+
+    def add_blogs(self, blog_ids, clean_contents):
+        """
+        Incrementally adds new blogs to the index.
+
+        The new blogs are vectorized with the existing vocabulary, which grows with any unseen
+        term. Only the neighbour lists of the new blogs, and the lists of the existing blogs
+        they enter, are computed; the existing rows are neither copied nor transposed. The
+        exact backend still scores every new blog against every blog, the IVF backend only
+        against the members of the probed clusters.
+
+        Parameters:
+        blog_ids (iterable): IDs of the new blogs.
+        clean_contents (iterable): Pre-processed content of the new blogs.
+
+        Returns:
+        int: Number of blogs added to the index.
+        """
+        with self._write_lock:
+            new_rows = [(int(blog_id), content) for blog_id, content in zip(blog_ids, clean_contents)
+                        if int(blog_id) not in self.positions]
+            if not new_rows:
+                return 0
+
+            # scikit-learn is only imported when the index changes; serving lookups does not need it
+            from sklearn.preprocessing import normalize
+
+            # Lookups never read the vocabulary or the rows past the current size, so both can be
+            # extended in place before the new blogs are published
+            n_old = self._size
+            n_new = n_old + len(new_rows)
+            new_counts = self._transform([content for _, content in new_rows])
+            new_vectors = normalize(new_counts, norm='l2', copy=False).tocsr()
+            self._vectors.append(new_vectors)
+            vectors = self._vectors.matrix(n_new, len(self.vocabulary))
+            old_vectors = self._vectors.matrix(n_old, len(self.vocabulary))
+
+            # Neighbour lists of the new blogs
+            self.search.add(vectors, n_old)
+            new_neighbours, new_scores = self.search.query(new_vectors, self.top_k, offset=n_old)
+
+            # Existing blogs whose neighbour lists the new blogs enter
+            rows, merged_neighbours, merged_scores = self._merge_into_neighbours(new_vectors, old_vectors, n_old)
+
+            if n_new > len(self._blog_ids):
+                capacity = _grown_capacity(len(self._blog_ids), n_new)
+                blog_ids_buffer = _with_capacity(self._blog_ids[:n_old], capacity)
+                neighbours_buffer = _with_capacity(self._neighbours[:n_old], capacity)
+                scores_buffer = _with_capacity(self._scores[:n_old], capacity)
+            else:
+                blog_ids_buffer, neighbours_buffer, scores_buffer = self._blog_ids, self._neighbours, self._scores
+            blog_ids_buffer[n_old:n_new] = [blog_id for blog_id, _ in new_rows]
+            neighbours_buffer[n_old:n_new] = new_neighbours
+            scores_buffer[n_old:n_new] = new_scores
+
+            with self._table_lock:
+                self._blog_ids, self._neighbours, self._scores = blog_ids_buffer, neighbours_buffer, scores_buffer
+                self._neighbours[rows] = merged_neighbours
+                self._scores[rows] = merged_scores
+                for pos in range(n_old, n_new):
+                    self.positions[int(self._blog_ids[pos])] = pos
+                self._size = n_new
+            self._dirty = True
+            return len(new_rows)
+
+    def _transform(self, clean_contents):
+        """
+        Vectorizes documents with the index vocabulary, appending unseen terms to it.
+        """
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        analyzer = CountVectorizer().build_analyzer()
+
+        data, indices, indptr = [], [], [0]
+        for content in clean_contents:
+            term_counts = {}
+            for term in analyzer(content if isinstance(content, str) else ''):
+                col = self.term_positions.get(term)
+                if col is None:
+                    col = len(self.vocabulary)
+                    self.term_positions[term] = col
+                    self.vocabulary.append(term)
+                term_counts[col] = term_counts.get(col, 0) + 1
+            indices.extend(term_counts.keys())
+            data.extend(term_counts.values())
+            indptr.append(len(indices))
+
+        return sp.csr_matrix((np.asarray(data, dtype=np.float32), indices, indptr),
+                             shape=(len(indptr) - 1, len(self.vocabulary)))
+
+    def _merge_into_neighbours(self, new_vectors, old_vectors, n_old):
+        """
+        Computes the neighbour lists of the existing blogs that the new blogs enter.
+
+        Returns:
+        tuple: (rows, neighbours, scores), the positions of the updated blogs and their new lists.
+        """
+        top_k = self.top_k
+        no_rows = (np.empty(0, dtype=np.int64), np.empty((0, top_k), dtype=np.int32),
+                   np.empty((0, top_k), dtype=np.float32))
+        if n_old == 0:
+            return no_rows
+
+        # Scored from the corpus side so that the corpus is not transposed
+        sims = (old_vectors @ new_vectors.T).T.tocoo()
+
+        # Lowest score currently kept by each existing blog (-1 while it has a free slot)
+        neighbours, scores = self._neighbours, self._scores
+        worst = np.where(neighbours[sims.col, -1] >= 0, scores[sims.col, -1], -1)
+        mask = sims.data > worst
+        if not mask.any():
+            return no_rows
+
+        new_pos = sims.row[mask] + n_old
+        old_pos = sims.col[mask]
+        new_scores = sims.data[mask].astype(np.float32)
+
+        order = np.argsort(old_pos, kind='stable')
+        old_pos, new_pos, new_scores = old_pos[order], new_pos[order], new_scores[order]
+        rows, starts = np.unique(old_pos, return_index=True)
+        ends = np.append(starts[1:], len(old_pos))
+
+        merged_neighbours = np.full((len(rows), top_k), -1, dtype=np.int32)
+        merged_scores = np.zeros((len(rows), top_k), dtype=np.float32)
+        for i, (row, start, end) in enumerate(zip(rows, starts, ends)):
+            kept = neighbours[row] >= 0
+            candidates = np.concatenate([neighbours[row][kept], new_pos[start:end]])
+            candidate_scores = np.concatenate([scores[row][kept], new_scores[start:end]])
+            best = np.argsort(-candidate_scores, kind='stable')[:top_k]
+            merged_neighbours[i, :len(best)] = candidates[best]
+            merged_scores[i, :len(best)] = candidate_scores[best]
+        return rows, merged_neighbours, merged_scores
+
+    def save(self, index_path: str = index_file, backend_path: str = backend_file):
+        """
+        Persists the neighbour table, the vectorized corpus and the search backend to disk.
+
+        The table and the vectors are written together in one file, each file through a
+        temporary file renamed over the previous one.
+        """
+        with self._write_lock:
+            vectors = self.vectors
+            arrays = {
+                "blog_ids": self.blog_ids,
+                "vocabulary": np.asarray(self.vocabulary, dtype=str),
+                "neighbours": self.neighbours,
+                "scores": self.scores,
+                "vectors_data": vectors.data,
+                "vectors_indices": vectors.indices,
+                "vectors_indptr": vectors.indptr,
+                "vectors_shape": np.asarray(vectors.shape),
+            }
+            write_atomically(index_path, lambda f: np.savez(f, **arrays))
+            if isinstance(self.search, IVFSearch):
+                write_atomically(backend_path, self.search.save)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+    def save_if_due(self, interval: float = SIMILARITY_SAVE_INTERVAL):
+        """
+        Saves the index if blogs were added to it and the last save is older than `interval` seconds.
+
+        Saving rewrites the whole index, so frequent small additions are persisted together.
+
+        Parameters:
+        interval (float): Minimum number of seconds between two saves (default: SIMILARITY_SAVE_INTERVAL).
+
+        Returns:
+        bool: True if the index was saved.
+        """
+        if not self._dirty or time.monotonic() - self._saved_at < interval:
+            return False
+        self.save()
+        return True
+
+    @classmethod
+    def load(cls, index_path: str = index_file, backend_path: str = backend_file):
+        """
+        Loads a similarity index previously written by `save`.
+
+        Raises:
+        ValueError: If the table and the vectors in the file do not describe the same blogs.
+        """
+        with np.load(index_path) as data:
+            blog_ids = data['blog_ids']
+            vocabulary = data['vocabulary'].tolist()
+            neighbours = data['neighbours']
+            scores = data['scores']
+            vectors = sp.csr_matrix((data['vectors_data'], data['vectors_indices'], data['vectors_indptr']),
+                                    shape=tuple(data['vectors_shape']))
+        if not len(blog_ids) == vectors.shape[0] == neighbours.shape[0] == scores.shape[0]:
+            raise ValueError(f"Inconsistent similarity index: {len(blog_ids)} blogs, {vectors.shape[0]} vectors, "
+                             f"{neighbours.shape[0]} neighbour lists")
+        if vectors.shape[1] != len(vocabulary):
+            raise ValueError(f"Inconsistent similarity index: {len(vocabulary)} terms, {vectors.shape[1]} columns")
+
+        search = None
+        if SIMILARITY_BACKEND == 'ivf' and os.path.exists(backend_path):
+            search = IVFSearch.load(backend_path, vectors, n_probe=SIMILARITY_N_PROBE)
+            # Discard a backend left over from an index of a different size
+            if len(search.labels) != vectors.shape[0]:
+                search = None
+        if search is None:
+            search = make_search(SIMILARITY_BACKEND, SIMILARITY_N_PROBE).fit(vectors)
+        return cls(blog_ids, vocabulary, vectors, neighbours, scores, search)
+
+
+def index_from_corpus(blog_ids, clean_contents, top_k: int = TOP_K, backend: str = SIMILARITY_BACKEND,
+                      n_probe: int = SIMILARITY_N_PROBE):
+    """
+    Vectorizes a corpus and builds its top-K neighbour table.
+
+    Parameters:
+    blog_ids (iterable): IDs of the blogs.
+    clean_contents (iterable): Pre-processed content of the blogs.
+    top_k (int): Number of neighbours kept per blog (default: TOP_K).
+    backend (str): Nearest-neighbour backend, 'exact' or 'ivf' (default: SIMILARITY_BACKEND).
+    n_probe (int): Clusters probed per query by the 'ivf' backend (default: SIMILARITY_N_PROBE).
+
+    Returns:
+    SimilarityIndex: The index.
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.preprocessing import normalize
+
+    # Vectorize the blog content using CountVectorizer (bag-of-words model)
+    count_vec = CountVectorizer()
+    counts = count_vec.fit_transform(clean_contents)
+    vocabulary = count_vec.get_feature_names_out()
+
+    # Normalize the rows so that a dot product is the cosine similarity
+    vectors = normalize(counts.astype(np.float32), norm='l2', copy=False).tocsr()
+
+    search = make_search(backend, n_probe).fit(vectors)
+    neighbours, scores = search.query(vectors, top_k, offset=0)
+    return SimilarityIndex(blog_ids, vocabulary, vectors, neighbours, scores, search)
+
+
+def build_similarity_index(data_path: str = data_file, top_k: int = TOP_K,
+                           backend: str = SIMILARITY_BACKEND, n_probe: int = SIMILARITY_N_PROBE):
+    """
+    Vectorizes the blog corpus and builds its top-K neighbour table.
+
+    Parameters:
+    data_path (str): Path of the blog data CSV (default: BlogData/blog_data.csv).
+    top_k (int): Number of neighbours kept per blog (default: TOP_K).
+    backend (str): Nearest-neighbour backend, 'exact' or 'ivf' (default: SIMILARITY_BACKEND).
+    n_probe (int): Clusters probed per query by the 'ivf' backend (default: SIMILARITY_N_PROBE).
+
+    Returns:
+    SimilarityIndex: The freshly built index.
+    """
+    blogs_df = blog_data_store(data_path).read(columns=['blog_id', 'clean_blog_content'])
+    return index_from_corpus(blogs_df['blog_id'].values, blogs_df['clean_blog_content'].fillna(''),
+                             top_k, backend, n_probe)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index(rebuild: bool = False):
+    """
+    Returns the process-wide similarity index, loading it from disk or building it if needed.
+
+    Parameters:
+    rebuild (bool): If True, rebuild the index from the blog data and persist it (default: False).
+
+    Returns:
+    SimilarityIndex: The similarity index.
+    """
+    global _index
+    if _index is not None and not rebuild:
+        return _index
+    # The index is loaded by the startup warm-up and may be requested by an endpoint at the same time
+    with _index_lock:
+        if _index is None or rebuild:
+            index = None
+            if not rebuild and os.path.exists(index_file):
+                try:
+                    index = SimilarityIndex.load()
+                except (OSError, KeyError, ValueError, zipfile.BadZipFile) as error:
+                    # Written by an older version or inconsistent: rebuilt below
+                    print("Loading the similarity index failed")
+                    print("Error:", error)
+            if index is not None:
+                # Blogs ingested after the last save are only in the blog data
+                blogs_df = blog_data_store(data_file).read(columns=['blog_id', 'clean_blog_content'])
+                missing = ~blogs_df['blog_id'].isin(index.positions.keys())
+                if missing.any():
+                    index.add_blogs(blogs_df['blog_id'][missing], blogs_df['clean_blog_content'][missing])
+                    index.save()
+                _index = index
+            else:
+                _index = build_similarity_index()
+                _index.save()
+    return _index
+
+
+def save_loaded_index():
+    """
+    Saves the process-wide similarity index if it was loaded and has unsaved blogs, e.g. at shutdown.
+    """
+    if _index is not None:
+        _index.save_if_due(interval=0)
+
+
+if __name__ == '__main__':
+    # Rebuild the persisted index:
+    # python -m Recommend_Blogs.Similarity_Index
+    index = get_similarity_index(rebuild=True)
+    print(f"Similarity index built for {len(index.blog_ids)} blogs (top {index.top_k} neighbours)")
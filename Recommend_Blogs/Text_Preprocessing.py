@@ -0,0 +1,121 @@
+import os
+import re
+import time
+from functools import lru_cache, partial
+import multiprocessing
+
+# Shared, compiled text processing resources; NLTK is imported on first use because it is
+# slow to import and the API only needs it when new blogs are added
+punctuation_regex = re.compile(r'[^\w\s]')
+
+# Maximum number of distinct words memoized by the lemmatizer and the stemmer
+WORD_CACHE_SIZE = 200000
+
+# Corpora smaller than this are processed in the calling process
+MIN_DOCS_FOR_POOL = 2000
+
+
+@lru_cache(maxsize=1)
+def get_lemmatizer():
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
+
+
+@lru_cache(maxsize=1)
+def get_stemmer():
+    from nltk.stem import PorterStemmer
+    return PorterStemmer()
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def lemmatize(word: str):
+    return get_lemmatizer().lemmatize(word)
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def stem(word: str):
+    return get_stemmer().stem(word)
+
+
+@lru_cache(maxsize=1)
+def english_stopwords():
+    """
+    Returns the NLTK English stopwords as a frozenset for O(1) membership tests.
+    """
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+
+def preprocess_text(text, flg_stemm=False, flg_lemm=True, stopword_set=None):
+    """
+    Preprocesses a single text: lowercases it, removes punctuation and stopwords and
+    optionally applies lemmatization and stemming.
+
+    Parameters:
+    text (str): The text to be pre-processed.
+    flg_stemm (bool): If True, apply stemming (default: False).
+    flg_lemm (bool): If True, apply lemmatization (default: True).
+    stopword_set (frozenset): Stopwords to remove (default: None).
+
+    Returns:
+    str: The cleaned and pre-processed text.
+    """
+    words = punctuation_regex.sub('', str(text).lower().strip()).split()
+
+    if stopword_set is not None:
+        words = [word for word in words if word not in stopword_set]
+    if flg_lemm:
+        words = [lemmatize(word) for word in words]
+    if flg_stemm:
+        words = [stem(word) for word in words]
+
+    return " ".join(words)
+
+
+def preprocess_corpus(texts, flg_stemm=False, flg_lemm=True, lst_stopwords=None, n_jobs=None,
+                      chunksize=256, verbose=False):
+    """
+    Preprocesses a batch of texts with shared resources, optionally across a process pool.
+
+    Parameters:
+    texts (iterable): The texts to be pre-processed.
+    flg_stemm (bool): If True, apply stemming (default: False).
+    flg_lemm (bool): If True, apply lemmatization (default: True).
+    lst_stopwords (iterable): Stopwords to remove (default: None).
+    n_jobs (int): Number of worker processes. None uses every CPU for corpora of at least
+                  MIN_DOCS_FOR_POOL texts and the calling process otherwise (default: None).
+                  Multi-threaded callers such as the API should pass 1.
+    chunksize (int): Number of texts sent to a worker at once (default: 256).
+    verbose (bool): If True, print the throughput in docs/sec (default: False).
+
+    Returns:
+    list: The cleaned texts, in the input order.
+    """
+    texts = list(texts)
+    stopword_set = frozenset(lst_stopwords) if lst_stopwords is not None else None
+    process = partial(preprocess_text, flg_stemm=flg_stemm, flg_lemm=flg_lemm, stopword_set=stopword_set)
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() if len(texts) >= MIN_DOCS_FOR_POOL else 1
+
+    start = time.perf_counter()
+    if n_jobs > 1:
+        # Workers are spawned rather than forked, since forking a multi-threaded process is unsafe
+        with multiprocessing.get_context('spawn').Pool(n_jobs) as pool:
+            cleaned = pool.map(process, texts, chunksize=chunksize)
+    else:
+        cleaned = [process(text) for text in texts]
+    elapsed = time.perf_counter() - start
+
+    if verbose and texts:
+        print(f"Pre-processed {len(texts)} docs in {elapsed:.2f}s "
+              f"({len(texts) / max(elapsed, 1e-9):.0f} docs/sec, {n_jobs} process(es))")
+    return cleaned
+
+
+def warm_up():
+    """
+    Loads the NLTK resources (stopwords and the WordNet corpus of the lemmatizer) ahead of first use.
+    """
+    english_stopwords()
+    get_lemmatizer().lemmatize('warm')
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+class TopicIndex:
+    """
+    Lookup table from blog ID to topic.
+
+    Topics are stored as categorical codes in a NumPy array indexed by blog ID (blog IDs are
+    auto-increment primary keys, so the table is dense), which turns the topic enrichment of
+    any number of rows into a single array gather instead of a scan of the blog data per row.
+    """
+
+    def __init__(self, blog_ids, topics):
+        topics = pd.Categorical(topics)
+        blog_ids = np.asarray(blog_ids, dtype=np.int64)
+        self.categories = topics.categories
+        self._codes = np.full(blog_ids.max() + 1 if len(blog_ids) else 0, -1, dtype=np.int32)
+        self._codes[blog_ids] = topics.codes
+
+    @classmethod
+    def from_blog_data(cls, blog_data):
+        """
+        Builds the index from the blog data.
+
+        Parameters:
+        blog_data (DataFrame): Blog data with blog_id and topic columns.
+
+        Returns:
+        TopicIndex: The index.
+        """
+        return cls(blog_data['blog_id'].to_numpy(), blog_data['topic'])
+
+    def topics(self, blog_ids):
+        """
+        Returns the topic of each blog.
+
+        Parameters:
+        blog_ids (array-like): Blog IDs.
+
+        Returns:
+        Categorical: Topic per blog ID, missing for unknown blogs.
+        """
+        blog_ids = np.asarray(blog_ids, dtype=np.int64)
+        codes = np.full(len(blog_ids), -1, dtype=np.int32)
+        known = (blog_ids >= 0) & (blog_ids < len(self._codes))
+        codes[known] = self._codes[blog_ids[known]]
+        return pd.Categorical.from_codes(codes, categories=self.categories)
+
+    def join(self, df, on: str = 'blog_id', column: str = 'topic'):
+        """
+        Adds the topic of the blog of every row to a DataFrame.
+
+        Parameters:
+        df (DataFrame): Rows with a blog ID column.
+        on (str): Name of the blog ID column (default: 'blog_id').
+        column (str): Name of the topic column to set (default: 'topic').
+
+        Returns:
+        DataFrame: The same DataFrame with the topic column.
+        """
+        df[column] = self.topics(df[on].to_numpy())
+        return df
@@ -1,15 +1,6 @@
 import pandas as pd
-import nltk
-import os
-import pathlib
-import re
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer, PorterStemmer
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-
-# Load NLTK stopwords for English
-lst_stopwords = stopwords.words('english')
+from Recommend_Blogs.Text_Preprocessing import preprocess_text
+from Recommend_Blogs.Similarity_Index import get_similarity_index
 
 
 def pre_process_text(text, flg_stemm=False, flg_lemm=True, lst_stopwords=None):
@@ -17,6 +8,8 @@ def pre_process_text(text, flg_stemm=False, flg_lemm=True, lst_stopwords=None):
     Preprocesses a given text by converting to lowercase, removing punctuation,
     removing stopwords, and optionally applying stemming or lemmatization.
 
+    Use Text_Preprocessing.preprocess_corpus to process many texts at once.
+
     Parameters:
     text (str): The text to be pre-processed.
     flg_stemm (bool): If True, apply stemming (default: False).
@@ -26,39 +19,19 @@ def pre_process_text(text, flg_stemm=False, flg_lemm=True, lst_stopwords=None):
     Returns:
     str: The cleaned and pre-processed text.
     """
-    # Convert text to lowercase and strip any extra whitespace
-    text = str(text).lower().strip()
-
-    # Remove punctuation using regular expressions
-    text = re.sub(r'[^\w\s]', '', text)
-
-    # Split text into words
-    lst_text = text.split()
-
-    # Remove stopwords if provided
+    stopword_set = None
     if lst_stopwords is not None:
-        lst_text = [word for word in lst_text if word not in lst_stopwords]
-
-    # Apply lemmatization if enabled
-    if flg_lemm:
-        lemmatizer = WordNetLemmatizer()
-        lst_text = [lemmatizer.lemmatize(word) for word in lst_text]
-
-    # Apply stemming if enabled
-    if flg_stemm:
-        stemmer = PorterStemmer()
-        lst_text = [stemmer.stem(word) for word in lst_text]
-
-    # Join the processed words back into a single string
-    text = " ".join(lst_text)
-
-    return text
+        stopword_set = lst_stopwords if isinstance(lst_stopwords, frozenset) else frozenset(lst_stopwords)
+    return preprocess_text(text, flg_stemm=flg_stemm, flg_lemm=flg_lemm, stopword_set=stopword_set)
 
 
 def get_similar_blog(blogs: dict, ratings: dict):
     """
     Recommends blogs based on user ratings and content similarity using cosine similarity.
 
+    The neighbours of every blog are read from the precomputed similarity index
+    (see Similarity_Index.py), so each rated blog costs a single O(K) lookup.
+
     Parameters:
     blogs (dict): Dictionary containing blog data (e.g., blog_id, content).
     ratings (dict): Dictionary containing user ratings for blogs (e.g., blog_id, ratings, timestamp).
@@ -66,18 +39,8 @@ def get_similar_blog(blogs: dict, ratings: dict):
     Returns:
     list: A list of recommended blog IDs.
     """
-    # Define the path to the CSV file containing the blog data
-    data_file = os.path.join(pathlib.Path(__file__).parent, "BlogData/blog_data.csv")
-
-    # Read the blog data from the CSV file
-    blogs_df = pd.read_csv(data_file)
-
-    # Vectorize the blog content using CountVectorizer (bag-of-words model)
-    count_vec = CountVectorizer()
-    similarity_matrix = count_vec.fit_transform(blogs_df['clean_blog_content'])
-
-    # Compute cosine similarity between blog content vectors
-    cosine_sim = cosine_similarity(similarity_matrix)
+    # Load the persisted similarity index (built once per process)
+    similarity_index = get_similarity_index()
 
     # Convert the ratings dictionary into a DataFrame for easier manipulation
     ratings_df = pd.DataFrame(ratings)
@@ -87,23 +50,19 @@ def get_similar_blog(blogs: dict, ratings: dict):
     blogs_to_consider = ratings_df[ratings_df['ratings'] >= 0.5]['blog_id']
     high_rated_blogs = blogs_to_consider.values
 
-    # Filter the blogs DataFrame for high-rated blogs
-    rated_blogs = blogs_df[blogs_df['blog_id'].isin(high_rated_blogs)]
-
     # List to store recommended blog IDs
     recommended_blogs = []
+    seen_blogs = set()
 
     # Iterate over each high-rated blog
     for blog_id in high_rated_blogs:
-        # Get the index of the high-rated blog in the DataFrame
-        temp_id = blogs_df[blogs_df['blog_id'] == blog_id].index.values[0]
-
         # Get blogs that have a cosine similarity score greater than 0.5
-        similar_blog_ids = blogs_df[cosine_sim[temp_id] > 0.5]['blog_id'].index.values
+        similar_blog_ids = similarity_index.similar_blogs(int(blog_id))
 
         # Add the recommended blog IDs to the list, ensuring no duplicates
-        for b_id in similar_blog_ids:
-            if b_id not in recommended_blogs:
+        for b_id in similar_blog_ids.tolist():
+            if b_id not in seen_blogs:
+                seen_blogs.add(b_id)
                 recommended_blogs.append(b_id)
 
     return recommended_blogs
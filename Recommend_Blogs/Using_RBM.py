@@ -1,52 +1,180 @@
 # Import necessary libraries
 import pandas as pd
-from app import cursor, get_user_ratings_in_json_format, ratings_df, rating_path
 import numpy as np
-import tensorflow as tf
-from recommenders.models.rbm.rbm import RBM
 from recommenders.datasets.sparse import AffinityMatrix
-from recommenders.datasets.python_splitters import numpy_stratified_split
-from pytz import timezone
-from datetime import datetime
+from Recommend_Blogs.Data_Store import (TOP_K_DTYPES, DatasetWriter, blog_data_store, iter_dataset,
+                                        ratings_store, read_dataset)
+from Recommend_Blogs.RBM_Training import (configure_tensorflow, dense_rows, make_rbm, sparse_affinity_matrix,
+                                          sparse_stratified_split, top_k_chunks)
+from Recommend_Blogs.Topic_Index import TopicIndex
+from contextlib import contextmanager
 import os
+import time
 
-# Load blog data and set paths
-blog_data_path = os.path.abspath("BlogData/blog_data.csv")
-blog_data = pd.read_csv(blog_data_path)
+# Training mode: 'incremental' warm-starts from the saved model and only retrains (and rescores)
+# the users whose ratings changed; 'full' retrains on all the users
+TRAINING_MODE = os.environ.get('RBM_TRAINING_MODE', 'incremental')
+FULL_EPOCHS = 30
+INCREMENTAL_EPOCHS = int(os.environ.get('RBM_INCREMENTAL_EPOCHS', 3))
+# Incremental runs ignore the ratings on blogs the saved model has never seen; a full retrain adds
+# them once RBM_FULL_RETRAIN_INTERVAL seconds have passed since the last one, or once more than
+# RBM_MAX_UNSEEN_BLOGS rated blogs are missing from the model
+FULL_RETRAIN_INTERVAL = float(os.environ.get('RBM_FULL_RETRAIN_INTERVAL', 86400))
+MAX_UNSEEN_BLOGS = int(os.environ.get('RBM_MAX_UNSEEN_BLOGS', 1000))
 
-model_path = os.path.join(os.getcwd(), "model/")
-top_k_recommendations_path = os.path.join(os.getcwd(), "RecommendedBlogs/top_k_reco.csv")
-top_k_df = pd.read_csv(top_k_recommendations_path)
+# Number of recommendations per user
+K = 10
 
-# Extract the previous recommendation timestamp
-old_datetime = top_k_df['timestamp'].values[0]
+# Paths, relative to this folder so that the job does not depend on the working directory
+base_path = os.path.dirname(os.path.abspath(__file__))
+blog_data_path = os.path.join(base_path, "BlogData/blog_data.csv")
+rating_path = os.path.join(os.path.dirname(base_path), "app/ratings/blog_ratings_V4.csv")
+model_path = os.path.join(base_path, "model/")
+model_file = model_path + 'rbm_model_V4.ckpt'
+# Blog IDs of the visible units of the saved model, in column order
+items_file = model_path + 'rbm_items_V4.npy'
+# Time of the last full retrain
+full_retrain_file = model_path + 'last_full_retrain.txt'
+top_k_recommendations_path = os.path.join(base_path, "RecommendedBlogs/top_k_reco.csv")
 
-# Get the current time in 'Asia/Kolkata' timezone
-curr_time = datetime.now(timezone("Asia/Kolkata")).strftime('%Y-%m-%d %H:%M:%S')
-datetime_obj = datetime.strptime(curr_time, '%Y-%m-%d %H:%M:%S')
+# Wall-clock time of each stage of the current run
+stage_times = {}
 
-# Fetch new user ratings between the last recommendation timestamp and the current time
-cursor.execute("SELECT * FROM ratings WHERE timestamp BETWEEN %s AND %s", (old_datetime, datetime_obj))
-ratings_list = cursor.fetchall()
 
-# Check if new ratings are available
-if not ratings_list:
-    print("No new ratings")
-else:
-    # Convert ratings into JSON format and load them into a DataFrame
-    ratings_json = get_user_ratings_in_json_format(ratings_list)
-    ratings_df_new = pd.DataFrame(ratings_json, index=None)
+@contextmanager
+def stage(name: str):
+    """
+    Measures and prints the wall-clock time of a stage of the job.
+    """
+    start = time.perf_counter()
+    yield
+    stage_times[name] = time.perf_counter() - start
+    print(f"[{name}] {stage_times[name]:.2f}s")
 
-    # Drop timestamp column from the new ratings DataFrame
-    ratings_df_new.drop(columns=['timestamp'], inplace=True)
 
-    # Concatenate new ratings with the existing ratings DataFrame
-    ratings_df = pd.concat([ratings_df, ratings_df_new])
+def last_recommendation_time():
+    """
+    Returns the time of the current recommendations.
+
+    Returns:
+    datetime: Timestamp stored with the recommendations.
+    """
+    top_k_df = read_dataset(top_k_recommendations_path, TOP_K_DTYPES, columns=['timestamp'])
+    return top_k_df['timestamp'].iloc[0].to_pydatetime()
+
+
+def fetch_new_ratings(db, since, until):
+    """
+    Fetches the ratings given or updated in a time window.
+
+    Parameters:
+    db (MySQLConnection): Database connection.
+    since (datetime): Start of the window.
+    until (datetime): End of the window.
+
+    Returns:
+    DataFrame: New ratings with userId, blog_id and ratings columns.
+    """
+    with stage("fetch ratings"):
+        cursor = db.cursor()
+        cursor.execute("SELECT user_id, blog_id, rating FROM ratings WHERE timestamp BETWEEN %s AND %s",
+                       (since, until))
+        ratings_list = cursor.fetchall()
+    return pd.DataFrame(ratings_list, columns=['userId', 'blog_id', 'ratings'])
+
+
+def drop_known_ratings(ratings_df_new):
+    """
+    Drops the fetched ratings that the ratings store already has with the same value.
+
+    Parameters:
+    ratings_df_new (DataFrame): Fetched ratings with userId, blog_id and ratings columns.
+
+    Returns:
+    DataFrame: The ratings that are new or changed.
+    """
+    if ratings_df_new.empty:
+        return ratings_df_new
+    known = ratings_store(rating_path).read(columns=['userId', 'blog_id', 'ratings'])
+    merged = ratings_df_new.merge(known, on=['userId', 'blog_id'], how='left', suffixes=('', '_known'))
+    changed = merged['ratings_known'].isna() | (
+        merged['ratings'].astype('float32') != merged['ratings_known'].astype('float32'))
+    return ratings_df_new[changed.to_numpy()].reset_index(drop=True)
+
+
+def full_retrain_reason(ratings_df, saved_items):
+    """
+    Returns why the run must retrain the RBM on all the users, or None if it can train incrementally.
+
+    Parameters:
+    ratings_df (DataFrame): All the ratings, with a blog_id column.
+    saved_items (ndarray): Blog IDs of the visible units of the saved model, or None if there is none.
+
+    Returns:
+    str: The reason for a full retrain, or None.
+    """
+    if TRAINING_MODE != 'incremental':
+        return f"RBM_TRAINING_MODE={TRAINING_MODE}"
+    if saved_items is None:
+        return "no saved model"
+    if not os.path.exists(full_retrain_file):
+        return "no previous full retrain"
+    with open(full_retrain_file) as f:
+        last_full_retrain = float(f.read().strip())
+    if time.time() - last_full_retrain > FULL_RETRAIN_INTERVAL:
+        return f"more than {FULL_RETRAIN_INTERVAL:.0f}s since the last full retrain"
+    unseen_blogs = np.setdiff1d(ratings_df['blog_id'].unique(), saved_items).size
+    if unseen_blogs > MAX_UNSEEN_BLOGS:
+        return f"{unseen_blogs} rated blogs missing from the model"
+    return None
+
+
+def update_recommendations(ratings_df_new, run_time):
+    """
+    Adds new ratings to the ratings store, retrains the RBM and publishes the new recommendations.
+
+    Parameters:
+    ratings_df_new (DataFrame): New ratings with userId, blog_id and ratings columns.
+    run_time (datetime): Timestamp stored with the recommendations.
+
+    Returns:
+    int: Number of recommendations written.
+    """
+    stage_times.clear()
+
+    # Load blog data
+    with stage("load data"):
+        blog_data = blog_data_store(blog_data_path).read(columns=['blog_id', 'topic'])
+
+    # Append only the new ratings to the ratings store and read back the latest ratings
+    with stage("append ratings"):
+        ratings_segments = ratings_store(rating_path)
+        ratings_segments.append(ratings_df_new)
+        ratings_df = ratings_segments.read()
     print(f"Updated ratings shape: {ratings_df.shape}")
 
-    # Remove duplicate ratings and save the updated ratings to CSV
-    ratings_df.drop_duplicates(inplace=True)
-    ratings_df.to_csv(rating_path, index=False)
+    # Users whose ratings changed since the last run
+    changed_users = ratings_df_new['userId'].unique()
+
+    saved_items = np.load(items_file) if os.path.exists(items_file) else None
+    reason = full_retrain_reason(ratings_df, saved_items)
+    incremental = reason is None
+    print(f"Training mode: {'incremental' if incremental else f'full ({reason})'}, "
+          f"{len(changed_users)} changed users")
+
+    # The possible ratings of the model come from all the ratings, whatever rows are trained
+    all_ratings = ratings_df['ratings'].to_numpy(dtype=np.float32)
+
+    if incremental:
+        # Incremental training keeps the column order of the saved model: only the rows of the
+        # changed users are built, without their ratings on blogs the model has never seen
+        ratings_df = ratings_df[ratings_df['userId'].isin(changed_users)]
+        seen = ratings_df['blog_id'].isin(saved_items)
+        print(f"Ratings on blogs missing from the model, dropped until the next full retrain: {(~seen).sum()}")
+        ratings_df = ratings_df[seen].reset_index(drop=True)
+        if ratings_df.empty:
+            print("No changed user has a rating on a blog of the model, recommendations unchanged")
+            return 0
 
     # Define the column names for the AffinityMatrix
     header = {
@@ -55,80 +183,89 @@ else:
         "col_rating": "ratings",
     }
 
-    # Generate the affinity matrix based on the updated ratings DataFrame
-    affinity_matrix = AffinityMatrix(df=ratings_df, **header)
-
-    # Obtain the sparse matrix representation of the affinity matrix
-    X, _, _ = affinity_matrix.gen_affinity_matrix()
-    print(f"Affinity Matrix shape: {X.shape}")
-
-    # Split the affinity matrix into training and testing sets
-    X_train, X_test = numpy_stratified_split(X)
+    with stage("affinity matrix"):
+        # Generate the affinity matrix based on the updated ratings DataFrame
+        affinity_matrix = AffinityMatrix(df=ratings_df, items_list=saved_items if incremental else None, **header)
 
-    # Configure TensorFlow to use the GPU if available
-    physical_devices = tf.config.list_physical_devices('GPU')
-    print(f"Available GPUs: {physical_devices}")
+        # Obtain the matrix representation of the affinity matrix, as a sparse matrix
+        X = sparse_affinity_matrix(affinity_matrix, ratings_df)
+        user_ids = np.array([affinity_matrix.map_back_users[i] for i in range(X.shape[0])])
+        item_ids = np.array([affinity_matrix.map_back_items[i] for i in range(X.shape[1])])
+        print(f"Affinity Matrix shape: {X.shape}")
 
-    if physical_devices:
-        try:
-            tf.config.experimental.set_memory_growth(physical_devices[0], True)
-        except:
-            pass
+    with stage("split"):
+        if incremental:
+            # The matrix only has the rows of the changed users, all of them are trained and scored
+            X_test = X
+            X_train = dense_rows(X)
+        else:
+            # Split the affinity matrix into training and testing sets; only the training set
+            # is densified, for the RBM
+            X_train, X_test = sparse_stratified_split(X)
+            X_train = dense_rows(X_train)
 
-    # Train the RBM model on the GPU
-    with tf.device('/gpu:0'):
-        # Initialize the RBM model with specified hyperparameters
-        model = RBM(
-            possible_ratings=np.setdiff1d(np.unique(X_train), np.array([0])),
-            visible_units=X_train.shape[1],
-            hidden_units=1200,
-            training_epoch=30,
-            minibatch_size=350,
-            keep_prob=0.7,
-            with_metrics=True
-        )
+    # Configure the TensorFlow device and thread pools (CPU unless RBM_DEVICE=gpu)
+    device = configure_tensorflow()
+    print(f"Training device: {device}")
 
-        # Load the pre-trained model from the given path
-        model.load(model_path + 'rbm_model_V4.ckpt')
+    import tensorflow as tf
 
-        # Train the model on the training data
-        model.fit(X_train)
+    with stage("training"):
+        with tf.device(device):
+            # Initialize the RBM model with specified hyperparameters
+            model = make_rbm(all_ratings, visible_units=X_train.shape[1],
+                             training_epoch=INCREMENTAL_EPOCHS if incremental else FULL_EPOCHS,
+                             n_rows=X_train.shape[0])
 
-    # Define the number of top recommendations to generate
-    K = 10
+            # Warm-start from the pre-trained model, unless its visible units no longer match the blogs
+            if saved_items is None or np.array_equal(saved_items, item_ids):
+                model.load(model_file)
 
-    # Predict the top K recommendations for the test set
-    top_k_predictions = model.recommend_k_items(X_test, K)
+            # Train the model on the training data
+            model.fit(X_train)
 
-    # Convert the recommendations to a DataFrame
-    predicted_df = pd.DataFrame(data=top_k_predictions)
+    with stage("scoring"):
+        # Topic of every blog, joined to a whole chunk of recommendations at once
+        topic_index = TopicIndex.from_blog_data(blog_data)
 
-    # Map the predictions back to blog IDs and user IDs
-    top_k_df = affinity_matrix.map_back_sparse(top_k_predictions, kind='prediction')
-    test_df = affinity_matrix.map_back_sparse(X_test, kind='ratings')
+        def with_topics(chunk):
+            topic_index.join(chunk)
+            # Add the run timestamp to the recommendations
+            chunk['timestamp'] = run_time
+            return chunk
 
-    # Fill missing predictions with 0
-    top_k_df['prediction'].fillna(0, axis=0, inplace=True)
+        # Write the recommendations chunk by chunk; the file replaces the previous recommendations
+        # only once it is complete, so the API never reads a partially written file
+        with DatasetWriter(top_k_recommendations_path, TOP_K_DTYPES) as writer:
+            if incremental:
+                # Keep the recommendations of the users who are not rescored
+                for chunk in iter_dataset(top_k_recommendations_path, TOP_K_DTYPES,
+                                          columns=['userId', 'blog_id', 'prediction']):
+                    writer.write(with_topics(chunk[~chunk['userId'].isin(user_ids)].copy()))
+            score_user_ids = user_ids
 
-    # Extract blog topics for the recommended blogs
-    final_topics = []
-    for blog in top_k_df['blog_id'].tolist():
-        final_topics.append(blog_data[blog_data['blog_id'] == blog]['topic'].values)
+            # Predict the top K recommendations of the scored users, one block of users at a time
+            for chunk in top_k_chunks(model, X_test, X_train, score_user_ids, item_ids, K):
+                writer.write(with_topics(chunk))
 
-    top_k_df['topic'] = pd.DataFrame(final_topics)
+    print(f"Recommendations written: {writer.rows}")
 
-    # Extract blog topics for the rated blogs
-    rated_blog_topics = []
-    for blog in ratings_df['blog_id'].tolist():
-        rated_blog_topics.append(blog_data[blog_data['blog_id'] == blog]['topic'].values)
+    with stage("save model"):
+        # Save the updated model and the blog IDs of its visible units only once its recommendations
+        # are published, so that a failed run leaves the previous model, recommendations and
+        # full retrain time consistent for the next run
+        model.save(model_file)
+        np.save(items_file, item_ids)
+        if not incremental:
+            with open(full_retrain_file, 'w') as f:
+                f.write(str(time.time()))
 
-    ratings_df['topic'] = pd.DataFrame(rated_blog_topics)
+    print(f"Total: {sum(stage_times.values()):.2f}s")
+    return writer.rows
 
-    # Save the updated model
-    model.save(model_path + 'rbm_model_V4.ckpt')
 
-    # Add the current timestamp to the recommendations DataFrame
-    top_k_df['timestamp'] = datetime_obj
+if __name__ == '__main__':
+    # Run the job once, with the locking and watermark handling of the recommendation worker
+    from Recommend_Blogs.Recommendation_Worker import main
 
-    # Save the recommendations to a CSV file
-    top_k_df.to_csv(top_k_recommendations_path, index=False)
+    main(['--once'])
@@ -1,30 +1,21 @@
 
 from fastapi import FastAPI, HTTPException, status, Response
 from fastapi.middleware.cors import CORSMiddleware
-import mysql.connector as SqlConnector
+import hashlib
+import orjson
 import pandas as pd
-import time
 import os
 from datetime import datetime
 from pytz import timezone
-from Recommend_Blogs.Using_Cosine_Similarity import pre_process_text
-
-# Establishing MySQL Database Connection
-while True:
-    try:
-        mydb = SqlConnector.connect(
-            host="HostURL",
-            user="UserName",
-            password="Password",
-            database="blog_recommendation_system"
-        )
-        cursor = mydb.cursor()
-        print("Connection to Database Successful")
-        break
-    except Exception as error:
-        print("Connection to Database Failed")
-        print("Error:", error)
-        time.sleep(2)
+from Recommend_Blogs.Data_Store import blog_data_store, ratings_store
+from app.database import get_connection, get_pool, pool_stats, run_db
+from app.like_counts import LikeCountIndex
+from app.feed_sampler import FeedSampler
+from app.popular_blogs import PopularBlogsCache
+from app.recommendation_store import RecommendationStore
+from app.response_cache import ResponseCache
+from app.interaction_writer import InteractionWriter, InteractionQueueFull, missing_unique_keys
+from app.exclusion_sets import ExclusionSets
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -39,45 +30,102 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load ratings CSV
+# Load ratings (append-only Parquet segments, imported from the CSV on first load)
 if os.path.basename(__file__) == '__init__.py':
     rating_path = os.path.join(os.getcwd(), 'app/ratings/blog_ratings_V4.csv')
 else:
     rating_path = os.path.join(os.path.abspath(os.path.join(os.getcwd(), os.pardir)), 'app/ratings/blog_ratings_V4.csv')
 
-ratings_df = pd.read_csv(rating_path)
+ratings_segments = ratings_store(rating_path)
+ratings_df = ratings_segments.read()
+ratings_mtime = ratings_segments.mtime()
+
+# Blog data (append-only Parquet segments), extended with the blogs added to the database
+blog_data_path = os.path.join(os.getcwd(), "Recommend_Blogs/BlogData/blog_data.csv")
+
+# Maximum age in seconds of the popular blog pools, and how often the background refresh runs
+POPULAR_BLOGS_TTL = float(os.environ.get("POPULAR_BLOGS_TTL", 600))
+POPULAR_BLOGS_CHECK_INTERVAL = float(os.environ.get("POPULAR_BLOGS_CHECK_INTERVAL", 30))
+
+# How often in seconds the background ingestion adds new blogs to the blog data and the similarity index
+BLOG_INGESTION_INTERVAL = float(os.environ.get("BLOG_INGESTION_INTERVAL", 600))
+
+# Top-K RBM recommendations, loaded at startup and hot-swapped when the file is rewritten
+recommendation_store = RecommendationStore(os.path.abspath('Recommend_Blogs/RecommendedBlogs/top_k_reco.csv'))
+RECOMMENDATIONS_CHECK_INTERVAL = float(os.environ.get("RECOMMENDATIONS_CHECK_INTERVAL", 30))
+
+# Like counts of every blog, loaded on first use and maintained by the like/unlike endpoints
+like_count_index = LikeCountIndex()
+
+# Candidate blog pools of the home feeds, computed by the popular blogs cache
+feed_sampler = FeedSampler()
+
+# Rows fetched from the database at a time by the streaming responses
+STREAM_FETCH_SIZE = int(os.environ.get("STREAM_FETCH_SIZE", 100))
+
+# Positions in a row of the blogs table of the fields shown on a blog card (blog_id, title, image
+# and topic, as read by blog_to_json), returned by the summary list responses. Their names are
+# read from the table on first use, see summary_select.
+SUMMARY_COLUMN_POSITIONS = (0, 2, 5, 6)
+_summary_select = None
+
+# Blogs liked or favorited by each user, excluded from their home feed
+EXCLUSION_SETS_MAX_USERS = int(os.environ.get("EXCLUSION_SETS_MAX_USERS", 100000))
+exclusion_sets = ExclusionSets(EXCLUSION_SETS_MAX_USERS)
+
+# Per-user responses of the liked, favourites and recommendation endpoints
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 10000))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 300))
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+# Seen, like and favourite events are written in group commits. 'sync' waits for the commit of
+# each event, 'buffered' acknowledges events as soon as they are queued
+INTERACTION_DURABILITY = os.environ.get("INTERACTION_DURABILITY", "sync")
+INTERACTION_BATCH_SIZE = int(os.environ.get("INTERACTION_BATCH_SIZE", 100))
+INTERACTION_MAX_DELAY = float(os.environ.get("INTERACTION_MAX_DELAY", 0))
+interaction_writer = InteractionWriter(get_connection, INTERACTION_DURABILITY, batch_size=INTERACTION_BATCH_SIZE,
+                                       max_delay=INTERACTION_MAX_DELAY)
 
 
 # Helper Functions
 
-def get_like_counts(blog_id: int):
+def sql_placeholders(values):
     """
-    Fetches the like counts for a blog by combining the database likes and ratings from the CSV file.
+    Returns a comma separated list of %s placeholders, one per value, for an IN (...) clause.
 
     Args:
-        blog_id (int): ID of the blog
+        values (list): Values bound to the placeholders
 
     Returns:
-        counts (int): Total like count
+        str: Placeholders string
     """
-    cursor.execute("SELECT * FROM likes WHERE blog_id=%s", [blog_id])
-    likes = cursor.fetchall()
-    counts = len(likes)
+    return ", ".join(["%s"] * len(values))
+
 
-    blog_list_df = ratings_df[ratings_df['blog_id'] == blog_id]
-    like_count = len(blog_list_df[blog_list_df['ratings'] == 1.5].values)
-    like_count += len(blog_list_df[blog_list_df['ratings'] == 2].values)
-    like_count += len(blog_list_df[blog_list_df['ratings'] == 5].values)
+def get_like_counts(db, blog_ids: list):
+    """
+    Fetches the like counts of several blogs from the in-memory like count index
+    (database likes combined with the ratings from the CSV file).
+
+    Args:
+        db (MySQLConnection): Database connection, used to load the index on first use
+        blog_ids (list): IDs of the blogs
 
-    counts += like_count
-    return counts
+    Returns:
+        counts (dict): Total like count per blog ID
+    """
+    like_count_index.ensure_loaded(db, ratings_df)
+    return like_count_index.get_many(blog_ids)
 
 
-def get_blogs_in_json_format(blogs_list: list, for_recommendation: bool = False):
+def get_blogs_in_json_format(db, blogs_list: list, for_recommendation: bool = False):
     """
     Converts the list of blogs into a JSON format.
 
+    Authors of all the blogs are fetched with one query and like counts come from the like count index.
+
     Args:
+        db (MySQLConnection): Database connection
         blogs_list (list): List of blogs
         for_recommendation (bool): Flag to handle recommendation format
 
@@ -95,114 +143,317 @@ def get_blogs_in_json_format(blogs_list: list, for_recommendation: bool = False)
             }
             blog_json.append(blog_dict)
         return blog_json
+    elif not blogs_list:
+        return blog_json
     else:
+        cursor = db.cursor()
+        author_ids = list({blog[1] for blog in blogs_list})
+        cursor.execute(f"SELECT author_id, author_name FROM author WHERE author_id IN ({sql_placeholders(author_ids)})",
+                       author_ids)
+        author_names = dict(cursor.fetchall())
+        like_counts = get_like_counts(db, [blog[0] for blog in blogs_list])
+
         for blog in blogs_list:
-            cursor.execute('SELECT author_name FROM author WHERE author_id=%s', [blog[1]])
-            author_name = cursor.fetchone()[0]
-            blog_dict = {
-                "blog_id": blog[0],
-                "authors": author_name,
-                "content_link": blog[4],
-                "title": blog[2],
-                "content": blog[3],
-                "image": blog[5],
-                "topic": blog[6],
-                "like_count": get_like_counts(blog[0]),
-                "scrape_time": blog[7]
-            }
-            blog_json.append(blog_dict)
+            blog_json.append(blog_to_json(blog, author_names.get(blog[1]), like_counts[blog[0]]))
         return blog_json
 
 
-def get_blogs_not_to_consider(user_id: int):
+def blog_to_json(blog, author_name: str, like_count: int):
     """
-    Retrieves the list of blog IDs that should not be recommended to a user (liked or favorited).
+    Converts a row of the blogs table into its JSON format.
 
     Args:
-        user_id (int): ID of the user
+        blog (tuple): Row of the blogs table
+        author_name (str): Name of the author
+        like_count (int): Like count of the blog
+
+    Returns:
+        blog_dict (dict): The blog in JSON format
+    """
+    return {
+        "blog_id": blog[0],
+        "authors": author_name,
+        "content_link": blog[4],
+        "title": blog[2],
+        "content": blog[3],
+        "image": blog[5],
+        "topic": blog[6],
+        "like_count": like_count,
+        "scrape_time": blog[7]
+    }
+
+
+def summary_select(db):
+    """
+    Returns the select list of the card columns of the blogs table, resolving their names once
+    from the positions that blog_to_json reads them from.
+
+    Args:
+        db (MySQLConnection): Database connection
+
+    Returns:
+        select_list (str): The quoted column names, comma separated
+    """
+    global _summary_select
+    if _summary_select is None:
+        cursor = db.cursor()
+        cursor.execute("SELECT * FROM blogs LIMIT 0")
+        cursor.fetchall()
+        names = [column[0] for column in cursor.description]
+        _summary_select = ", ".join(f"`{names[position]}`" for position in SUMMARY_COLUMN_POSITIONS)
+    return _summary_select
+
+
+def blog_to_summary_json(blog, like_count: int):
+    """
+    Converts a row of the card columns of the blogs table into the JSON format of a blog card.
+
+    Args:
+        blog (tuple): Row of the columns returned by summary_select
+        like_count (int): Like count of the blog
+
+    Returns:
+        blog_dict (dict): The blog card in JSON format
+    """
+    return {
+        "blog_id": blog[0],
+        "title": blog[1],
+        "image": blog[2],
+        "topic": blog[3],
+        "like_count": like_count
+    }
+
+
+def get_blog_summaries_in_json_format(db, blog_ids: list):
+    """
+    Fetches the card fields of blogs, in the order of the given IDs, without their content.
+
+    Args:
+        db (MySQLConnection): Database connection
+        blog_ids (list): IDs of the blogs
 
     Returns:
-        blog_id_not_to_consider_tuple (tuple): Tuple of blog IDs to exclude from recommendations
+        blog_json (list): List of blog cards in JSON format
     """
-    # Get liked and favorited blogs
-    cursor.execute("SELECT blog_id FROM likes WHERE user_id=%s", (user_id,))
-    liked_blog_list = cursor.fetchall()
+    if not blog_ids:
+        return []
+    cursor = db.cursor()
+    cursor.execute(f"SELECT {summary_select(db)} FROM blogs WHERE blog_id IN ({sql_placeholders(blog_ids)})",
+                   list(blog_ids))
+    blogs = {blog[0]: blog for blog in cursor.fetchall()}
+    like_counts = get_like_counts(db, list(blogs))
+    return [blog_to_summary_json(blogs[blog_id], like_counts[blog_id]) for blog_id in blog_ids if blog_id in blogs]
 
-    cursor.execute("SELECT blog_id FROM favourites WHERE user_id=%s", (user_id,))
-    favourites_blog_list = cursor.fetchall()
 
-    blog_id_not_to_consider_list = []
+def blogs_response(db, blog_ids: list, summary: bool = False):
+    """
+    Fetches blogs in the JSON format of the list endpoints, in the order of the given IDs.
+
+    Args:
+        db (MySQLConnection): Database connection
+        blog_ids (list): IDs of the blogs
+        summary (bool): Return only the card fields of each blog (default: False)
 
-    # Combine liked and favorited blog IDs
-    if liked_blog_list:
-        blog_id_not_to_consider_list.extend([blog_id[0] for blog_id in liked_blog_list])
-    if favourites_blog_list:
-        blog_id_not_to_consider_list.extend(
-            [blog_id[0] for blog_id in favourites_blog_list if blog_id[0] not in blog_id_not_to_consider_list])
+    Returns:
+        blog_json (list): List of blogs in JSON format
+    """
+    if summary:
+        return get_blog_summaries_in_json_format(db, blog_ids)
+    return get_blogs_in_json_format(db, get_blogs_by_ids(db, blog_ids))
 
-    return tuple(blog_id_not_to_consider_list)
+
+def blog_etag(body: bytes):
+    """
+    Computes the ETag of a blog response from its body, so it changes with the blog and its like count.
+
+    Args:
+        body (bytes): Response body
+
+    Returns:
+        etag (str): Quoted ETag
+    """
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
 
 
-def add_user_ratings(user_id: int, blog_id: int):
+def etag_matches(if_none_match: str, etag: str):
     """
-    Adds a user rating for a specific blog.
+    Checks whether an If-None-Match header matches an ETag (weak comparison, as for GET requests).
 
     Args:
+        if_none_match (str): Value of the If-None-Match header, or None
+        etag (str): Quoted ETag of the current response
+
+    Returns:
+        bool: True if the client's copy is current
+    """
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+def stream_blogs_in_json_format(blog_ids: list, summary: bool = False):
+    """
+    Streams blogs as a JSON array, in the order of the given IDs.
+
+    The blogs are fetched STREAM_FETCH_SIZE at a time and each batch is encoded with orjson and
+    sent before the next one is fetched, so memory use and time to first byte do not grow with
+    the number of blogs. Each batch is a short buffered query on a connection that goes back to
+    the pool before the batch is sent: a slow client never holds a connection, and a stream
+    aborted by the client leaves no unread result behind.
+
+    Args:
+        blog_ids (list): IDs of the blogs
+        summary (bool): Stream only the card fields of each blog (default: False)
+
+    Yields:
+        bytes: Successive parts of the JSON array
+    """
+    blog_ids = list(blog_ids)
+    separator = b"["
+    for start in range(0, len(blog_ids), STREAM_FETCH_SIZE):
+        batch_ids = blog_ids[start:start + STREAM_FETCH_SIZE]
+        with get_connection() as db:
+            like_count_index.ensure_loaded(db, ratings_df)
+            cursor = db.cursor()
+            if summary:
+                cursor.execute(f"SELECT {summary_select(db)} FROM blogs "
+                               f"WHERE blog_id IN ({sql_placeholders(batch_ids)})", batch_ids)
+            else:
+                # Authors are joined in the same query instead of a second lookup per batch
+                cursor.execute(f"""
+                    SELECT blogs.*, author.author_name FROM blogs
+                    LEFT JOIN author ON author.author_id = blogs.author_id
+                    WHERE blogs.blog_id IN ({sql_placeholders(batch_ids)})
+                """, batch_ids)
+            rows = {row[0]: row for row in cursor.fetchall()}
+
+        rows = [rows[blog_id] for blog_id in batch_ids if blog_id in rows]
+        if not rows:
+            continue
+        like_counts = like_count_index.get_many([row[0] for row in rows])
+        if summary:
+            blogs = (blog_to_summary_json(row, like_counts[row[0]]) for row in rows)
+        else:
+            blogs = (blog_to_json(row, row[-1], like_counts[row[0]]) for row in rows)
+        yield separator + b",".join(orjson.dumps(blog) for blog in blogs)
+        separator = b","
+    yield b"]" if separator == b"," else b"[]"
+
+
+def load_feed_pools(db):
+    """
+    Loads the candidate pools of the home feeds: every blog, and the top-rated blogs shown
+    before login and to users with no activity.
+
+    Args:
+        db (MySQLConnection): Database connection
+    """
+    cursor = db.cursor()
+    cursor.execute("SELECT blog_id FROM blogs")
+    all_blog_ids = [row[0] for row in cursor.fetchall()]
+    feed_sampler.set_pool('all', all_blog_ids)
+
+    for pool_name, top_rated_df in [('home', ratings_df[ratings_df['ratings'] <= 3.5]),
+                                    ('no_activity', ratings_df[ratings_df['ratings'] > 3.5])]:
+        top_rated_blogs = top_rated_df.value_counts().head(30000)
+        top_blog_ids = set([x[0] for x in top_rated_blogs.index])
+        # Only keep blogs that exist in the blogs table
+        feed_sampler.set_pool(pool_name, top_blog_ids.intersection(all_blog_ids))
+
+
+def sample_blog_ids(pool_name: str, size: int, exclude=None):
+    """
+    Samples random blog IDs from a feed pool.
+
+    The pools are computed at startup, before the first request, and kept fresh by the
+    background refresh.
+
+    Args:
+        pool_name (str): Name of the pool ('all', 'home' or 'no_activity')
+        size (int): Number of blogs
+        exclude (set): Blog IDs that must not be returned (default: None)
+
+    Returns:
+        blog_ids (list): Blog IDs, in random order
+    """
+    popular_blogs_cache.lookup()
+    return feed_sampler.sample(pool_name, size, exclude)
+
+
+def get_blogs_by_ids(db, blog_ids: list):
+    """
+    Fetches blog rows by primary key, in the order of the given IDs.
+
+    Args:
+        db (MySQLConnection): Database connection
+        blog_ids (list): IDs of the blogs
+
+    Returns:
+        blogs_list (list): Blog rows
+    """
+    if not blog_ids:
+        return []
+    cursor = db.cursor()
+    cursor.execute(f"SELECT * FROM blogs WHERE blog_id IN ({sql_placeholders(blog_ids)})", list(blog_ids))
+    blogs = {blog[0]: blog for blog in cursor.fetchall()}
+    return [blogs[blog_id] for blog_id in blog_ids if blog_id in blogs]
+
+
+def get_user_blog_ids(db, table: str, user_id: int):
+    """
+    Fetches the IDs of the blogs a user liked or favorited.
+
+    Args:
+        db (MySQLConnection): Database connection
+        table (str): 'likes' or 'favourites'
         user_id (int): ID of the user
-        blog_id (int): ID of the blog
 
     Returns:
-        str: Response indicating success or if rating already exists
+        blog_ids (list): Blog IDs
     """
-    cursor.execute("SELECT * FROM ratings WHERE blog_id=%s AND user_id=%s", [blog_id, user_id])
-    if cursor.fetchone():
-        return "Already exist"
-    else:
-        curr_time = datetime.now(timezone("Asia/Kolkata")).strftime('%Y-%m-%d %H:%M:%S')
-        datetime_obj = datetime.strptime(curr_time, '%Y-%m-%d %H:%M:%S')
-        cursor.execute("INSERT INTO ratings(user_id, blog_id, rating, timestamp) VALUES (%s, %s, %s, %s)",
-                       [user_id, blog_id, 0.5, datetime_obj])
-        mydb.commit()
-        return "seen"
+    cursor = db.cursor()
+    cursor.execute(f"SELECT blog_id FROM {table} WHERE user_id=%s", (user_id,))
+    return [row[0] for row in cursor.fetchall()]
 
 
-def update_user_rating(user_id: int):
+def update_user_rating(db, user_id: int):
     """
-    Updates user ratings based on likes and favorites.
+    Updates the ratings of a user based on their likes and favorites: 2 for a liked blog,
+    3.5 for a favorited blog and 5 for a blog that is both.
+
+    A single statement joins only this user's ratings with their likes and favourites (through the
+    (user_id, blog_id) keys), so its cost depends on the user's activity, not on the table sizes.
+    Ratings that already have the right value are left untouched, which keeps their timestamp and
+    does not make the RBM job pick them up again.
 
     Args:
+        db (MySQLConnection): Database connection
         user_id (int): ID of the user
     """
+    cursor = db.cursor()
     curr_time = datetime.now(timezone("Asia/Kolkata")).strftime('%Y-%m-%d %H:%M:%S')
     datetime_obj = datetime.strptime(curr_time, '%Y-%m-%d %H:%M:%S')
 
-    # Update ratings for liked blogs
-    cursor.execute("""
-        UPDATE ratings SET rating=%s, timestamp=%s 
-        WHERE user_id=%s AND blog_id IN 
-            (SELECT likes.blog_id FROM likes INNER JOIN ratings 
-             ON likes.user_id = ratings.user_id AND likes.blog_id = ratings.blog_id)
-    """, [2, datetime_obj, user_id])
-    mydb.commit()
-
-    # Update ratings for favorited blogs
-    cursor.execute("""
-        UPDATE ratings SET rating=%s, timestamp=%s 
-        WHERE user_id=%s AND blog_id IN 
-            (SELECT favourites.blog_id FROM favourites INNER JOIN ratings 
-             ON favourites.user_id = ratings.user_id AND favourites.blog_id = ratings.blog_id)
-    """, [3.5, datetime_obj, user_id])
-    mydb.commit()
-
-    # Update ratings for blogs that are both liked and favorited
     cursor.execute("""
-        UPDATE ratings SET rating=%s, timestamp=%s 
-        WHERE user_id=%s AND blog_id IN 
-            (SELECT favourites.blog_id FROM favourites 
-             INNER JOIN likes ON likes.user_id = favourites.user_id 
-             AND likes.blog_id = favourites.blog_id)
-    """, [5, datetime_obj, user_id])
-    mydb.commit()
+        UPDATE ratings
+        LEFT JOIN likes ON likes.user_id = ratings.user_id AND likes.blog_id = ratings.blog_id
+        LEFT JOIN favourites ON favourites.user_id = ratings.user_id AND favourites.blog_id = ratings.blog_id
+        SET ratings.rating = CASE
+                WHEN likes.blog_id IS NOT NULL AND favourites.blog_id IS NOT NULL THEN 5
+                WHEN favourites.blog_id IS NOT NULL THEN 3.5
+                ELSE 2
+            END,
+            ratings.timestamp = %s
+        WHERE ratings.user_id = %s
+          AND (likes.blog_id IS NOT NULL OR favourites.blog_id IS NOT NULL)
+          AND ratings.rating <> CASE
+                WHEN likes.blog_id IS NOT NULL AND favourites.blog_id IS NOT NULL THEN 5
+                WHEN favourites.blog_id IS NOT NULL THEN 3.5
+                ELSE 2
+            END
+    """, [datetime_obj, user_id])
+    db.commit()
 
 
 def get_user_ratings_in_json_format(ratings_list: list):
@@ -227,41 +478,80 @@ def get_user_ratings_in_json_format(ratings_list: list):
     return ratings_json
 
 
-def get_blogs_for_recommendation(recommended_blogs: tuple):
+def fetch_new_blogs(db):
     """
-    Fetches recommended blogs and formats them in JSON format.
+    Fetches the blogs added to the database since the last ingestion. Runs at startup and then
+    periodically in the background, followed by `ingest_new_blogs`.
 
     Args:
-        recommended_blogs (tuple): Tuple of recommended blog IDs
+        db (MySQLConnection): Database connection
 
     Returns:
-        blogs_json (list): List of blogs in JSON format
+        blog_data (DataFrame): blog_id, content and topic of the new blogs, or None if there are none
     """
-    cursor.execute(f'SELECT * FROM blogs WHERE blog_id IN {recommended_blogs}')
+    cursor = db.cursor()
+    cursor.execute("SELECT MAX(blog_id) FROM blogs")
+    max_id = cursor.fetchone()
+
+    last_blog_id = blog_data_store(blog_data_path).read(columns=['blog_id'])['blog_id'].max()
+
+    # Check if new blogs are added
+    if max_id[0] is None or max_id[0] <= last_blog_id:
+        return None
+    cursor.execute('SELECT blog_id, blog_content, topic FROM blogs WHERE blog_id > %s', [int(last_blog_id)])
     blogs_list = cursor.fetchall()
-    blogs_json = get_blogs_in_json_format(blogs_list)
-    return blogs_json
+    blogs_json = get_blogs_in_json_format(db, blogs_list, for_recommendation=True)
+    blog_data = pd.DataFrame(blogs_json)
+    blog_data.columns = ['blog_id', 'content', 'topic']
+    return blog_data
 
 
-def on_start():
+def ingest_new_blogs(blog_data):
     """
-    Executes when the application starts. It updates the blog data CSV if new blogs are added.
+    Adds new blogs to the blog data, the feed pool and the similarity index. It does not use the
+    database, so it runs without holding a pooled connection while the index loads or grows.
+
+    Args:
+        blog_data (DataFrame): blog_id, content and topic of the new blogs, from `fetch_new_blogs`
     """
-    cursor.execute("SELECT MAX(blog_id) FROM blogs")
-    max_id = cursor.fetchone()
+    # Imported here so that the API starts without loading NLTK and scikit-learn
+    from Recommend_Blogs.Text_Preprocessing import preprocess_corpus
+    from Recommend_Blogs.Similarity_Index import get_similarity_index
+
+    # Pre-processed in this thread: the API process is multi-threaded, so it must not fork a process pool
+    blog_data['clean_blog_content'] = preprocess_corpus(
+        blog_data['content'], flg_stemm=False, flg_lemm=True, lst_stopwords=None, n_jobs=1,
+        verbose=True)
+    # Only the new blogs are written, as a new segment of the blog data
+    blog_data_store(blog_data_path).append(blog_data)
+    feed_sampler.add_to_pool('all', blog_data['blog_id'])
+
+    # Add only the new blogs to the similarity index instead of rebuilding it
+    similarity_index = get_similarity_index()
+    similarity_index.add_blogs(blog_data['blog_id'], blog_data['clean_blog_content'])
+    similarity_index.save_if_due()
 
-    data_path = os.path.join(os.getcwd(), "Recommend_Blogs/BlogData/blog_data.csv")
-    blog_data = pd.read_csv(data_path)
-    last_blog_id = blog_data['blog_id'].iloc[-1]
-
-    # Check if new blogs are added and update the blog data CSV
-    if max_id[0] > last_blog_id:
-        cursor.execute(f'SELECT blog_id, blog_content, topic FROM blogs WHERE blog_id > {last_blog_id}')
-        blogs_list = cursor.fetchall()
-        blogs_json = get_blogs_in_json_format(blogs_list, for_recommendation=True)
-        blog_data_2 = pd.DataFrame(blogs_json)
-        blog_data_2.columns = ['blog_id', 'content', 'topic']
-        blog_data_2['clean_blog_content'] = blog_data_2['content'].apply(
-            lambda x: pre_process_text(x, flg_stemm=False, flg_lemm=True, lst_stopwords=None))
-        blog_data = pd.concat([blog_data, blog_data_2], ignore_index=True)
-        blog_data.to_csv(data_path, index=False)
+
+# Popular blog pools, computed once and refreshed in the background
+# (new blogs are ingested by a separate background task, so the pools never wait for it)
+popular_blogs_cache = PopularBlogsCache(load_feed_pools, ttl=POPULAR_BLOGS_TTL)
+
+
+def reload_ratings_if_changed():
+    """
+    Reloads the ratings if they were rewritten (e.g. by the RBM job) and invalidates
+    the data derived from it.
+
+    Returns:
+        bool: True if the ratings were reloaded
+    """
+    global ratings_df, ratings_mtime
+    mtime = ratings_segments.mtime()
+    if mtime == ratings_mtime:
+        return False
+
+    ratings_df = ratings_segments.read()
+    ratings_mtime = mtime
+    like_count_index.loaded = False
+    popular_blogs_cache.invalidate()
+    return True
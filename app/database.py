@@ -0,0 +1,173 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+import mysql.connector as SqlConnector
+from mysql.connector import pooling
+
+# MySQL connection settings
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "HostURL"),
+    "user": os.environ.get("DB_USER", "UserName"),
+    "password": os.environ.get("DB_PASSWORD", "Password"),
+    "database": os.environ.get("DB_NAME", "blog_recommendation_system"),
+    # Buffer results so that a partially read SELECT never blocks the next statement
+    "buffered": True,
+}
+
+# Pool settings (mysql.connector allows at most 32 connections per pool)
+POOL_NAME = "blog_api_pool"
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+CONNECT_RETRIES = int(os.environ.get("DB_CONNECT_RETRIES", 5))
+CONNECT_RETRY_DELAY = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(POOL_SIZE)
+# Dedicated threads running the blocking database calls of the async endpoints
+_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="db")
+_stats_lock = threading.Lock()
+_stats = {
+    "pending": 0,
+    "acquired": 0,
+    "in_use": 0,
+    "max_in_use": 0,
+    "wait_seconds": 0.0,
+    "timeouts": 0,
+    "reconnects": 0,
+}
+
+
+def get_pool():
+    """
+    Returns the MySQL connection pool, creating it on first use.
+
+    The database is retried CONNECT_RETRIES times before giving up.
+
+    Returns:
+        pool (MySQLConnectionPool): The connection pool
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    with _pool_lock:
+        for attempt in range(1, CONNECT_RETRIES + 1):
+            if _pool is not None:
+                break
+            try:
+                _pool = pooling.MySQLConnectionPool(pool_name=POOL_NAME, pool_size=POOL_SIZE,
+                                                    pool_reset_session=True, **DB_CONFIG)
+                print("Connection to Database Successful")
+            except SqlConnector.Error as error:
+                print(f"Connection to Database Failed (attempt {attempt}/{CONNECT_RETRIES})")
+                print("Error:", error)
+                if attempt == CONNECT_RETRIES:
+                    raise
+                time.sleep(CONNECT_RETRY_DELAY)
+    return _pool
+
+
+@contextmanager
+def get_connection():
+    """
+    Checks a healthy connection out of the pool and returns it when the block exits.
+
+    Waits up to POOL_TIMEOUT seconds for a free connection. Broken connections are
+    reconnected before being handed out, and uncommitted work is rolled back on error.
+
+    Yields:
+        connection (PooledMySQLConnection): A pooled database connection
+    """
+    pool = get_pool()
+    start = time.perf_counter()
+    if not _slots.acquire(timeout=POOL_TIMEOUT):
+        with _stats_lock:
+            _stats["timeouts"] += 1
+        raise SqlConnector.errors.PoolError("Timed out waiting for a database connection")
+
+    connection = None
+    try:
+        connection = pool.get_connection()
+        if not connection.is_connected():
+            connection.reconnect(attempts=CONNECT_RETRIES, delay=CONNECT_RETRY_DELAY)
+            with _stats_lock:
+                _stats["reconnects"] += 1
+
+        with _stats_lock:
+            _stats["acquired"] += 1
+            _stats["in_use"] += 1
+            _stats["max_in_use"] = max(_stats["max_in_use"], _stats["in_use"])
+            _stats["wait_seconds"] += time.perf_counter() - start
+
+        try:
+            yield connection
+        except Exception:
+            # A failed rollback (e.g. on a lost connection) must not hide the original error
+            try:
+                connection.rollback()
+            except Exception as error:
+                print("Rollback failed")
+                print("Error:", error)
+            raise
+        finally:
+            with _stats_lock:
+                _stats["in_use"] -= 1
+    finally:
+        # The slot is released even if closing a dead connection or one with unread results fails
+        try:
+            if connection is not None:
+                connection.close()
+        except Exception as error:
+            print("Returning the connection to the pool failed")
+            print("Error:", error)
+        finally:
+            _slots.release()
+
+
+def _call_with_connection(fn, *args, **kwargs):
+    with get_connection() as connection:
+        return fn(connection, *args, **kwargs)
+
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Runs blocking database work on the database thread pool without blocking the event loop.
+
+    The function receives a pooled connection as its first argument, followed by the given
+    arguments. The connection is checked out inside the worker thread and returned to the
+    pool as soon as the function completes.
+
+    Args:
+        fn (callable): Function taking a connection as its first argument
+
+    Returns:
+        The return value of fn
+    """
+    with _stats_lock:
+        _stats["pending"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, partial(_call_with_connection, fn, *args, **kwargs))
+    finally:
+        with _stats_lock:
+            _stats["pending"] -= 1
+
+
+def pool_stats():
+    """
+    Returns the pool utilization metrics.
+
+    Returns:
+        stats (dict): Pool size, connections in use, queued calls, utilization and counters
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["pool_size"] = POOL_SIZE
+    stats["utilization"] = stats["in_use"] / POOL_SIZE
+    stats["avg_wait_ms"] = 1000 * stats["wait_seconds"] / max(1, stats["acquired"])
+    return stats
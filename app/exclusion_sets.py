@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+
+class ExclusionSets:
+    """
+    In-memory sets of the blogs each user liked or favorited, which are excluded from their home feed.
+
+    A user's sets are loaded with one query the first time they are needed and then kept up to
+    date by the like, unlike and favourite endpoints. Likes and favourites are kept apart so that
+    unliking a favorited blog still excludes it. At most `max_users` users are kept, least
+    recently used first out.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._users = OrderedDict()
+        # [loads in progress, version] of the users whose sets are being loaded; the version is
+        # bumped by every change made during a load
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, db, user_id: int):
+        """
+        Returns the blogs excluded from a user's feed.
+
+        Args:
+            db (MySQLConnection): Database connection, used to load the user's sets on first use
+            user_id (int): User ID
+
+        Returns:
+            blog_ids (set): IDs of the blogs the user liked or favorited
+        """
+        with self._lock:
+            sets = self._users.get(user_id)
+            if sets is not None:
+                self._users.move_to_end(user_id)
+                return sets["like"] | sets["favourite"]
+            loading = self._loading.setdefault(user_id, [0, 0])
+            loading[0] += 1
+            version = loading[1]
+
+        sets = {"like": set(), "favourite": set()}
+        try:
+            cursor = db.cursor()
+            cursor.execute("""
+                SELECT 'like', blog_id FROM likes WHERE user_id=%s
+                UNION ALL
+                SELECT 'favourite', blog_id FROM favourites WHERE user_id=%s
+            """, (user_id, user_id))
+            for kind, blog_id in cursor.fetchall():
+                sets[kind].add(blog_id)
+        except Exception:
+            with self._lock:
+                self._finish_loading(user_id)
+            raise
+
+        with self._lock:
+            # Only keep the sets if no like or favourite of the user changed while they were loaded
+            if self._finish_loading(user_id) == version:
+                self._users[user_id] = sets
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return sets["like"] | sets["favourite"]
+
+    def _finish_loading(self, user_id):
+        # Called with the lock held. Returns the version reached during the load; the entry is
+        # dropped with the last load in progress
+        loading = self._loading[user_id]
+        loading[0] -= 1
+        if loading[0] == 0:
+            del self._loading[user_id]
+        return loading[1]
+
+    def add(self, user_id: int, kind: str, blog_id: int):
+        """
+        Records that a user liked (kind='like') or favorited (kind='favourite') a blog.
+        """
+        self._update(user_id, kind, blog_id, set.add)
+
+    def remove(self, user_id: int, kind: str, blog_id: int):
+        """
+        Records that a user unliked (kind='like') or unfavorited (kind='favourite') a blog.
+        """
+        self._update(user_id, kind, blog_id, set.discard)
+
+    def _update(self, user_id, kind, blog_id, operation):
+        with self._lock:
+            # Only a load in progress can miss the change; cached sets are updated in place
+            loading = self._loading.get(user_id)
+            if loading is not None:
+                loading[1] += 1
+            sets = self._users.get(user_id)
+            if sets is not None:
+                operation(sets[kind], blog_id)
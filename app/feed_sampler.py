@@ -0,0 +1,55 @@
+import threading
+import numpy as np
+
+
+class FeedSampler:
+    """
+    Samples random blog IDs for the home feeds from in-memory candidate pools.
+
+    Each pool is a sorted NumPy array of blog IDs. Sampling is done in Python, so the
+    database only has to fetch the chosen rows by primary key instead of sorting the
+    whole candidate set with ORDER BY RAND().
+    """
+
+    def __init__(self, seed=None):
+        self._rng = np.random.default_rng(seed)
+        self._rng_lock = threading.Lock()
+        self._pools = {}
+
+    def set_pool(self, name: str, blog_ids):
+        """
+        Replaces the candidate pool with the given blog IDs.
+        """
+        self._pools[name] = np.unique(np.asarray(list(blog_ids), dtype=np.int64))
+
+    def add_to_pool(self, name: str, blog_ids):
+        """
+        Adds blog IDs to an existing candidate pool.
+        """
+        pool = self._pools.get(name, np.empty(0, dtype=np.int64))
+        self._pools[name] = np.union1d(pool, np.asarray(list(blog_ids), dtype=np.int64))
+
+    def sample(self, name: str, size: int, exclude=None):
+        """
+        Draws up to `size` distinct blog IDs from a pool, skipping the excluded ones.
+
+        Args:
+            name (str): Name of the pool
+            size (int): Number of blog IDs to draw
+            exclude (set): Blog IDs that must not be drawn (default: None)
+
+        Returns:
+            blog_ids (list): The sampled blog IDs, in random order
+        """
+        pool = self._pools.get(name)
+        if pool is None or len(pool) == 0:
+            return []
+
+        # Draw enough candidates to still have `size` IDs after removing the excluded ones
+        exclude = set(exclude) if exclude else set()
+        n_draw = min(len(pool), size + len(exclude))
+        with self._rng_lock:
+            candidates = self._rng.choice(pool, n_draw, replace=False)
+
+        blog_ids = [blog_id for blog_id in candidates.tolist() if blog_id not in exclude]
+        return blog_ids[:size]
@@ -0,0 +1,243 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Statements of each interaction. They rely on these unique keys to make a repeated event a no-op:
+#   likes(user_id, blog_id), favourites(user_id, blog_id) and ratings(user_id, blog_id)
+INSERT_LIKE = "INSERT IGNORE INTO likes(user_id, blog_id, date_created) VALUES (%s, %s, %s)"
+INSERT_FAVOURITE = "INSERT IGNORE INTO favourites(user_id, blog_id) VALUES (%s, %s)"
+INSERT_SEEN_RATING = "INSERT IGNORE INTO ratings(user_id, blog_id, rating, timestamp) VALUES (%s, %s, %s, %s)"
+
+# Tables whose unique (user_id, blog_id) key the statements above rely on
+UNIQUE_KEY_TABLES = ("likes", "favourites", "ratings")
+
+# Rating given to a blog the user has seen
+SEEN_RATING = 0.5
+
+INTERACTIONS = ("seen", "like", "favourite")
+DURABILITY_MODES = ("sync", "buffered")
+
+
+def missing_unique_keys(db):
+    """
+    Returns the tables that have no unique key on (user_id, blog_id), without which a repeated
+    event would insert a duplicate row instead of being ignored.
+
+    Args:
+        db (MySQLConnection): Database connection
+
+    Returns:
+        tables (list): Names of the tables missing the key
+    """
+    cursor = db.cursor()
+    missing = []
+    for table in UNIQUE_KEY_TABLES:
+        cursor.execute(f"SHOW INDEX FROM {table}")
+        # Non_unique, Key_name and Column_name are the 2nd, 3rd and 5th columns of SHOW INDEX
+        unique_keys = {}
+        for row in cursor.fetchall():
+            if int(row[1]) == 0:
+                unique_keys.setdefault(row[2], set()).add(row[4])
+        # Any unique key within (user_id, blog_id) makes a repeated pair a duplicate
+        if not any(columns <= {"user_id", "blog_id"} for columns in unique_keys.values()):
+            missing.append(table)
+    return missing
+
+
+class InteractionQueueFull(Exception):
+    """
+    Raised by `InteractionWriter.submit` when `queue_size` events are already waiting to be written.
+    """
+
+
+class InteractionWriter:
+    """
+    Writes seen, like and favourite events to the database in group commits.
+
+    Events are queued in memory and written by a background thread, which takes up to
+    `batch_size` queued events, or whatever arrived within `max_delay` seconds of the first one,
+    and commits them in a single transaction. With the default `max_delay` of 0 a batch is
+    whatever queued up while the previous batch was being committed, so batches grow with the load
+    without delaying events when the load is light. Every event is an INSERT IGNORE, so a repeated
+    event is a no-op instead of a SELECT followed by an INSERT.
+
+    With `durability='sync'` callers wait for the commit of their event and learn whether it
+    inserted a row. With `durability='buffered'` callers return as soon as the event is queued;
+    a crash loses at most the queued events (`queue_size`) and the batch being written. The
+    durability mode is applied by the caller (wait for the future or not); the writer itself
+    behaves the same in both modes.
+
+    `submit` never blocks: when the queue is full it raises InteractionQueueFull. An event whose
+    caller stopped waiting (its future was cancelled) is still written, only its result is dropped.
+    """
+
+    def __init__(self, connect, durability: str = "sync", batch_size: int = 100, max_delay: float = 0.0,
+                 queue_size: int = 10000):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
+        # Context manager factory yielding a database connection, e.g. database.get_connection
+        self.connect = connect
+        self.durability = durability
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"events": 0, "inserted": 0, "batches": 0, "failed_events": 0, "rejected_events": 0,
+                       "write_seconds": 0.0}
+
+    def start(self):
+        """
+        Starts the background writer thread.
+        """
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="interaction-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """
+        Writes the queued events and stops the writer thread.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, kind: str, user_id: int, blog_id: int, timestamp, on_commit=None):
+        """
+        Queues an interaction event.
+
+        Args:
+            kind (str): 'seen', 'like' or 'favourite'
+            user_id (int): User ID
+            blog_id (int): Blog ID
+            timestamp (datetime): Time of the event
+            on_commit (callable): Called with True/False (row inserted or not) by the writer thread once
+                                  the event is committed (default: None)
+
+        Returns:
+            future (Future): Resolved with True if the event inserted a row, False if it already existed
+
+        Raises:
+            InteractionQueueFull: If `queue_size` events are already waiting to be written
+        """
+        if kind not in INTERACTIONS:
+            raise ValueError(f"Unknown interaction: {kind}")
+        self.start()
+        future = Future()
+        try:
+            self._queue.put_nowait((kind, user_id, blog_id, timestamp, on_commit, future))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["rejected_events"] += 1
+            raise InteractionQueueFull(f"{self._queue.maxsize} interaction events are already queued")
+        return future
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            event = self._queue.get()
+            if event is None:
+                break
+            batch = [event]
+
+            # Group the events that arrive within max_delay of the first one, up to batch_size
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    event = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
+
+            # The thread must survive any error, otherwise every later event would wait forever
+            try:
+                self._write(batch)
+            except Exception as error:
+                print("Interaction writer failed")
+                print("Error:", error)
+
+    def _write(self, batch):
+        # Once running, a future can no longer be cancelled, so it can safely be resolved below.
+        # The events of cancelled futures are still written.
+        waiting = [future.set_running_or_notify_cancel() for *_, future in batch]
+
+        start = time.perf_counter()
+        try:
+            with self.connect() as db:
+                inserted = self._execute(db, batch)
+                db.commit()
+        except Exception as error:
+            print(f"Writing {len(batch)} interaction events failed")
+            print("Error:", error)
+            with self._stats_lock:
+                self._stats["failed_events"] += len(batch)
+            for (*_, future), is_waiting in zip(batch, waiting):
+                if is_waiting:
+                    future.set_exception(error)
+            return
+
+        with self._stats_lock:
+            self._stats["events"] += len(batch)
+            self._stats["inserted"] += sum(inserted)
+            self._stats["batches"] += 1
+            self._stats["write_seconds"] += time.perf_counter() - start
+
+        for (kind, user_id, blog_id, timestamp, on_commit, future), row_inserted, is_waiting in zip(
+                batch, inserted, waiting):
+            if on_commit is not None:
+                try:
+                    on_commit(row_inserted)
+                except Exception as error:
+                    print("Interaction commit callback failed")
+                    print("Error:", error)
+            if is_waiting:
+                future.set_result(row_inserted)
+
+    def _execute(self, db, batch):
+        cursor = db.cursor()
+        event_rows = [self._rows(kind, user_id, blog_id, timestamp)
+                      for kind, user_id, blog_id, timestamp, *_ in batch]
+
+        # One statement per row to get the rowcount of every event (the like counts depend on it),
+        # all in a single transaction
+        inserted = []
+        for rows in event_rows:
+            results = []
+            for statement, params in rows:
+                cursor.execute(statement, params)
+                results.append(cursor.rowcount > 0)
+            # The first statement is the interaction itself, the others are side effects
+            inserted.append(results[0])
+        return inserted
+
+    @staticmethod
+    def _rows(kind, user_id, blog_id, timestamp):
+        seen_rating = (INSERT_SEEN_RATING, (user_id, blog_id, SEEN_RATING, timestamp))
+        if kind == "seen":
+            return [seen_rating]
+        if kind == "like":
+            return [(INSERT_LIKE, (user_id, blog_id, timestamp)), seen_rating]
+        return [(INSERT_FAVOURITE, (user_id, blog_id)), seen_rating]
+
+    def stats(self):
+        """
+        Returns the write counters.
+
+        Returns:
+            stats (dict): Events, batches, average batch size and write time, queued and failed events
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["avg_batch_size"] = stats["events"] / max(1, stats["batches"])
+        stats["avg_write_ms"] = 1000 * stats["write_seconds"] / max(1, stats["batches"])
+        stats["durability"] = self.durability
+        return stats
@@ -0,0 +1,125 @@
+import threading
+
+# Ratings in the ratings CSV that count as a like
+LIKE_RATINGS = [1.5, 2, 5]
+
+
+class LikeCountIndex:
+    """
+    In-memory like count of every blog.
+
+    Counts combine the likes derived from the ratings CSV with the rows of the `likes` table.
+    They are loaded once with a single grouped query and then kept up to date by the like and
+    unlike endpoints, so a lookup never touches the database or the ratings DataFrame.
+    Likes and unlikes that arrive while the index is being rebuilt are reconciled with the new
+    counts, so they are neither lost nor counted twice by the swap.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+        # Serializes the loads, so that concurrent requests after an invalidation build the index once
+        self._load_lock = threading.RLock()
+        # Deltas received during a load, None when no load is in progress
+        self._pending = None
+        self.loaded = False
+
+    def ensure_loaded(self, db, ratings_df):
+        """
+        Loads the index unless it is loaded already, waiting for a load in progress in another thread.
+
+        Args:
+            db (MySQLConnection): Database connection
+            ratings_df (DataFrame): Ratings loaded from the ratings CSV
+        """
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.load(db, ratings_df)
+
+    def load(self, db, ratings_df):
+        """
+        (Re)builds the index from the ratings DataFrame and the likes table.
+
+        Likes and unlikes are recorded from before the grouped query, and the query may or may not
+        have seen them. Instead of replaying their deltas, the likes of the recorded (user, blog)
+        pairs are read in the same snapshot as the counts, and each pair contributes the difference
+        between its state in the snapshot and its state after its last recorded event.
+
+        Args:
+            db (MySQLConnection): Database connection; a transaction in progress on it is committed
+            ratings_df (DataFrame): Ratings loaded from the ratings CSV
+        """
+        with self._load_lock:
+            liked_ratings = ratings_df[ratings_df['ratings'].isin(LIKE_RATINGS)]
+            counts = liked_ratings.groupby('blog_id').size().to_dict()
+
+            # Record the likes and unlikes committed from here on, the query may not see them
+            with self._lock:
+                self._pending = []
+            try:
+                # Both queries below must read the same snapshot, taken after the recording started
+                if db.in_transaction:
+                    db.commit()
+                db.start_transaction(consistent_snapshot=True, readonly=True)
+                cursor = db.cursor()
+                cursor.execute("SELECT blog_id, COUNT(*) FROM likes GROUP BY blog_id")
+                for blog_id, like_count in cursor.fetchall():
+                    counts[blog_id] = counts.get(blog_id, 0) + like_count
+
+                # Pairs whose state in the snapshot is known, rechecked until no new pair was recorded
+                liked_in_snapshot = {}
+                while True:
+                    with self._lock:
+                        # The last event of a pair gives its current state
+                        liked_now = {(user_id, blog_id): delta > 0 for user_id, blog_id, delta in self._pending}
+                        unchecked = [pair for pair in liked_now if pair not in liked_in_snapshot]
+                        if not unchecked:
+                            for (user_id, blog_id), liked in liked_now.items():
+                                correction = int(liked) - int(liked_in_snapshot[(user_id, blog_id)])
+                                counts[blog_id] = max(0, counts.get(blog_id, 0) + correction)
+                            self._pending = None
+                            self._counts = counts
+                            self.loaded = True
+                            break
+                    liked_in_snapshot.update(self._liked_pairs(cursor, unchecked))
+                db.commit()
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+    @staticmethod
+    def _liked_pairs(cursor, pairs):
+        """
+        Returns whether each (user_id, blog_id) pair is in the likes table.
+        """
+        cursor.execute(f"""
+            SELECT user_id, blog_id FROM likes
+            WHERE (user_id, blog_id) IN ({', '.join(['(%s, %s)'] * len(pairs))})
+        """, [value for pair in pairs for value in pair])
+        liked = set(cursor.fetchall())
+        return {pair: pair in liked for pair in pairs}
+
+    def get_many(self, blog_ids):
+        """
+        Returns the like count of each blog.
+
+        Args:
+            blog_ids (list): IDs of the blogs
+
+        Returns:
+            counts (dict): Like count per blog ID
+        """
+        counts = self._counts
+        return {blog_id: counts.get(blog_id, 0) for blog_id in blog_ids}
+
+    def add(self, user_id: int, blog_id: int, delta: int = 1):
+        """
+        Adjusts the like count of a blog after a user's like (delta=1) or unlike (delta=-1) is committed.
+        """
+        with self._lock:
+            self._counts[blog_id] = max(0, self._counts.get(blog_id, 0) + delta)
+            if self._pending is not None:
+                self._pending.append((user_id, blog_id, delta))
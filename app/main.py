@@ -1,6 +1,227 @@
+import asyncio
 import os
+import sys
+from fastapi import Header
+from fastapi.responses import StreamingResponse
 from app import *
-from Recommend_Blogs import Using_Cosine_Similarity
+
+
+@app.on_event('startup')
+async def start_warm_up():
+    """
+    Starts the warm-up in the background, so that the server accepts requests without waiting for it.
+    """
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+
+
+def warm_up():
+    """
+    Imports the heavy recommendation modules and loads the similarity index and the NLTK corpora.
+    Anything requested before the warm-up has finished is loaded on first use instead.
+    """
+    try:
+        from Recommend_Blogs import Using_Cosine_Similarity
+        from Recommend_Blogs.Similarity_Index import get_similarity_index
+        from Recommend_Blogs.Text_Preprocessing import warm_up as warm_up_text_preprocessing
+
+        get_similarity_index()
+        warm_up_text_preprocessing()
+    except Exception as error:
+        print("Warm-up failed")
+        print("Error:", error)
+
+
+@app.on_event('startup')
+async def connect_to_database():
+    """
+    Creates the database connection pool, retrying until the database is reachable.
+    """
+    get_pool()
+
+
+@app.on_event('startup')
+async def check_interaction_keys():
+    """
+    Refuses to start if the unique keys that make a repeated seen, like or favourite event a no-op are missing.
+    """
+    missing = await run_db(missing_unique_keys)
+    if missing:
+        raise RuntimeError(f"Missing unique (user_id, blog_id) keys on {', '.join(missing)}, "
+                           "apply migrations/001_interaction_unique_keys.sql")
+
+
+@app.on_event('startup')
+async def start_popular_blogs_refresh():
+    """
+    Computes the popular blog pools before the server accepts requests, so that the feeds are never
+    empty, then starts the background task that keeps them fresh.
+    """
+    await run_db(popular_blogs_cache.refresh)
+    asyncio.create_task(refresh_popular_blogs_periodically())
+
+
+async def refresh_popular_blogs_periodically():
+    """
+    Every POPULAR_BLOGS_CHECK_INTERVAL seconds, reloads the ratings if they changed and recomputes
+    the popular blog pools once they are stale. A failed refresh keeps the previous pools.
+    """
+    while True:
+        await asyncio.sleep(POPULAR_BLOGS_CHECK_INTERVAL)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, reload_ratings_if_changed)
+            if popular_blogs_cache.is_stale():
+                await run_db(popular_blogs_cache.refresh)
+        except Exception as error:
+            print("Popular blogs refresh failed")
+            print("Error:", error)
+
+
+@app.on_event('startup')
+async def start_blog_ingestion():
+    """
+    Starts the background task that adds new blogs to the blog data and the similarity index.
+    """
+    asyncio.create_task(ingest_new_blogs_periodically())
+
+
+async def ingest_new_blogs_periodically():
+    """
+    Ingests the blogs added since the last run at startup, then every BLOG_INGESTION_INTERVAL seconds.
+    A failed ingestion is retried at the next run and does not affect the feeds.
+    """
+    while True:
+        try:
+            blog_data = await run_db(fetch_new_blogs)
+            if blog_data is not None:
+                # Pre-processing and the similarity index do not need the connection, nor a database thread
+                await asyncio.get_running_loop().run_in_executor(None, ingest_new_blogs, blog_data)
+        except Exception as error:
+            print("Blog ingestion failed")
+            print("Error:", error)
+        await asyncio.sleep(BLOG_INGESTION_INTERVAL)
+
+
+@app.on_event('startup')
+async def load_recommendations():
+    """
+    Loads the RBM recommendations and starts watching the recommendations file for updates.
+    """
+    recommendation_store.load()
+    asyncio.create_task(reload_recommendations_periodically())
+
+
+async def reload_recommendations_periodically():
+    """
+    Every RECOMMENDATIONS_CHECK_INTERVAL seconds, hot-swaps the RBM recommendations if
+    Using_RBM.py wrote a new file.
+    """
+    while True:
+        await asyncio.sleep(RECOMMENDATIONS_CHECK_INTERVAL)
+        try:
+            if await asyncio.get_running_loop().run_in_executor(None, recommendation_store.reload_if_changed):
+                response_cache.invalidate_endpoint('rbm')
+                response_cache.invalidate_endpoint(cache_endpoint('rbm', summary=True))
+        except Exception as error:
+            print("Reloading the RBM recommendations failed")
+            print("Error:", error)
+
+
+def cache_endpoint(endpoint: str, summary: bool):
+    """
+    Returns the name under which the full or summary responses of an endpoint are cached.
+    """
+    return f"{endpoint}_summary" if summary else endpoint
+
+
+async def cached_response(endpoint: str, user_id: int, query):
+    """
+    Returns the cached response of a per-user endpoint, running its query on a miss.
+
+    Args:
+        endpoint (str): Name of the endpoint in the response cache
+        user_id (int): User ID
+        query (function): Computes the response from a database connection, or a coroutine function
+                          without arguments for a response that is not computed on a single connection
+
+    Returns:
+        The response
+    """
+    response = response_cache.get(endpoint, user_id)
+    if response is not None:
+        return response
+    started_at = response_cache.start_time()
+    response = await query() if asyncio.iscoroutinefunction(query) else await run_db(query)
+    response_cache.put(endpoint, user_id, response, started_at)
+    return response
+
+
+async def record_interaction(kind: str, user_id: int, blog_id: int, on_commit=None):
+    """
+    Queues a seen, like or favourite event for the next group commit.
+
+    Args:
+        kind (str): 'seen', 'like' or 'favourite'
+        user_id (int): User ID
+        blog_id (int): Blog ID
+        on_commit (function): Called with True if the event inserted a row, once it is committed (default: None)
+
+    Returns:
+        bool: Whether the event inserted a row, or None in buffered mode where the commit is not awaited
+
+    Raises:
+        HTTPException: 503 if the write queue is full
+    """
+    curr_time = datetime.now(timezone("Asia/Kolkata")).strftime('%Y-%m-%d %H:%M:%S')
+    datetime_obj = datetime.strptime(curr_time, '%Y-%m-%d %H:%M:%S')
+    try:
+        future = interaction_writer.submit(kind, user_id, blog_id, datetime_obj, on_commit)
+    except InteractionQueueFull as error:
+        # Shed the load instead of blocking the event loop until the writer catches up
+        print("Interaction event rejected")
+        print("Error:", error)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Too many pending writes, try again later")
+    if interaction_writer.durability == 'buffered':
+        return None
+    return await asyncio.wrap_future(future)
+
+
+def streaming_blogs_response(blog_ids: list, summary: bool = False):
+    """
+    Streams blogs as a JSON array, fetched and encoded in batches (see stream_blogs_in_json_format).
+
+    Args:
+        blog_ids (list): IDs of the blogs, in the order of the response
+        summary (bool): Stream only the card fields of each blog (default: False)
+
+    Returns:
+        StreamingResponse: The blogs in JSON format
+    """
+    return StreamingResponse(stream_blogs_in_json_format(blog_ids, summary), media_type='application/json')
+
+
+@app.on_event('shutdown')
+async def flush_interactions():
+    """
+    Writes the queued interaction events before the server exits.
+    """
+    await asyncio.get_running_loop().run_in_executor(None, interaction_writer.stop)
+
+
+@app.on_event('shutdown')
+async def save_similarity_index():
+    """
+    Saves the blogs added to the similarity index since its last periodic save.
+    """
+    # Only if an endpoint or the warm-up loaded the index
+    similarity_index_module = sys.modules.get('Recommend_Blogs.Similarity_Index')
+    if similarity_index_module is None:
+        return
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, similarity_index_module.save_loaded_index)
+    except Exception as error:
+        print("Saving the similarity index failed")
+        print("Error:", error)
 
 
 @app.get('/')
@@ -11,6 +232,38 @@ async def root():
     return {"message": "Welcome to the Blog API Created by Yaksh Shah"}
 
 
+@app.get('/metrics/db')
+async def get_database_metrics():
+    """
+    Returns the database connection pool utilization metrics.
+    """
+    return pool_stats()
+
+
+@app.get('/metrics/cache')
+async def get_response_cache_metrics():
+    """
+    Returns the size, hit rates and eviction counters of the per-user response cache.
+    """
+    return response_cache.stats()
+
+
+@app.get('/metrics/writes')
+async def get_interaction_write_metrics():
+    """
+    Returns the group commit metrics of the seen, like and favourite events.
+    """
+    return interaction_writer.stats()
+
+
+@app.get('/metrics/popular')
+async def get_popular_blogs_metrics():
+    """
+    Returns the popular blogs cache hit/miss and staleness metrics.
+    """
+    return popular_blogs_cache.stats()
+
+
 @app.post('/register/name/{user_name}/email/{user_email}')
 async def register_user(user_name: str, user_email: str):
     """
@@ -24,12 +277,16 @@ async def register_user(user_name: str, user_email: str):
     Returns:
         str: Confirmation message on successful registration.
     """
-    user_query = ''' INSERT INTO user_profile(user_name, user_email, user_pic)
-                     VALUES (%s, %s, %s) '''
-    user_info = (user_name, user_email, 'default_profile_pic.jpg')
-    cursor.execute(user_query, user_info)
-    mydb.commit()
-    return "User Registration Completed"
+    def query(db):
+        cursor = db.cursor()
+        user_query = ''' INSERT INTO user_profile(user_name, user_email, user_pic)
+                         VALUES (%s, %s, %s) '''
+        user_info = (user_name, user_email, 'default_profile_pic.jpg')
+        cursor.execute(user_query, user_info)
+        db.commit()
+        return "User Registration Completed"
+
+    return await run_db(query)
 
 
 @app.get('/login/email/{user_email}')
@@ -43,15 +300,19 @@ async def user_login(user_email: str):
     Returns:
         dict: User details or a message if the user is not found.
     """
-    cursor.execute(''' SELECT user_id, user_name, user_email FROM user_profile 
-                       WHERE user_email=%s''', [user_email])
-    resp = cursor.fetchone()
-    if resp is not None:
-        user_details = {'user_id': resp[0], 'user_name': resp[1], 'user_email': resp[2], "user_res": "Found"}
-        update_user_rating(user_details['user_id'])
-        return user_details
-    else:
-        return {"user_res": "Not Found"}
+    def query(db):
+        cursor = db.cursor()
+        cursor.execute(''' SELECT user_id, user_name, user_email FROM user_profile 
+                           WHERE user_email=%s''', [user_email])
+        resp = cursor.fetchone()
+        if resp is not None:
+            user_details = {'user_id': resp[0], 'user_name': resp[1], 'user_email': resp[2], "user_res": "Found"}
+            update_user_rating(db, user_details['user_id'])
+            return user_details
+        else:
+            return {"user_res": "Not Found"}
+
+    return await run_db(query)
 
 
 @app.post('/update/name/{user_name}/id/{user_id}')
@@ -66,10 +327,14 @@ async def update_user_name(user_name: str, user_id: int):
     Returns:
         str: Confirmation message on successful update.
     """
-    cursor.execute(""" UPDATE user_profile SET user_name=%s WHERE user_id=%s""",
-                   [user_name, user_id])
-    mydb.commit()
-    return "User Name Updated"
+    def query(db):
+        cursor = db.cursor()
+        cursor.execute(""" UPDATE user_profile SET user_name=%s WHERE user_id=%s""",
+                       [user_name, user_id])
+        db.commit()
+        return "User Name Updated"
+
+    return await run_db(query)
 
 
 @app.post('/update/image/{user_pic}/id/{user_id}')
@@ -84,10 +349,14 @@ async def update_user_profile_pic(user_pic: str, user_id: int):
     Returns:
         str: Confirmation message on successful update.
     """
-    cursor.execute(""" UPDATE user_profile SET user_pic=%s WHERE user_id=%s""",
-                   [user_pic, user_id])
-    mydb.commit()
-    return "User Profile Pic Updated"
+    def query(db):
+        cursor = db.cursor()
+        cursor.execute(""" UPDATE user_profile SET user_pic=%s WHERE user_id=%s""",
+                       [user_pic, user_id])
+        db.commit()
+        return "User Profile Pic Updated"
+
+    return await run_db(query)
 
 
 @app.get('/name/{user_name}')
@@ -101,13 +370,17 @@ async def verify_user_name(user_name: str):
     Returns:
         str: "unique" if the name is unique, otherwise "not unique".
     """
-    cursor.execute(''' SELECT user_name FROM user_profile 
-                       WHERE user_name=%s''', [user_name])
-    result = cursor.fetchone()
-    if result:
-        return "not unique"
-    else:
-        return "unique"
+    def query(db):
+        cursor = db.cursor()
+        cursor.execute(''' SELECT user_name FROM user_profile 
+                           WHERE user_name=%s''', [user_name])
+        result = cursor.fetchone()
+        if result:
+            return "not unique"
+        else:
+            return "unique"
+
+    return await run_db(query)
 
 
 @app.get('/image/id/{user_id}')
@@ -121,164 +394,226 @@ async def get_user_profile_pic(user_id: int):
     Returns:
         dict: The profile picture file name.
     """
-    cursor.execute(""" SELECT user_pic FROM user_profile WHERE user_id=%s""", [user_id])
-    resp = cursor.fetchone()
-    return {"user_img": resp[0]}
+    def query(db):
+        cursor = db.cursor()
+        cursor.execute(""" SELECT user_pic FROM user_profile WHERE user_id=%s""", [user_id])
+        resp = cursor.fetchone()
+        return {"user_img": resp[0]}
+
+    return await run_db(query)
 
 
 @app.get('/blogs')
-async def get_blogs_for_home_before_login():
+async def get_blogs_for_home_before_login(stream: bool = False, summary: bool = False):
     """
     Retrieves top-rated blogs for the homepage (before login).
 
+    Args:
+        stream (bool): Stream the response in batches (default: False).
+        summary (bool): Return only the card fields of each blog (default: False).
+
     Returns:
         list: A list of blog details in JSON format.
     """
-    on_start()
-    top_rated_blogs = ratings_df[ratings_df['ratings'] <= 3.5].value_counts().head(30000)
-    top_blog_ids = list(set([x[0] for x in top_rated_blogs.index]))
-    cursor.execute(f""" SELECT * FROM blogs WHERE blog_id IN {tuple(top_blog_ids)} ORDER BY RAND() LIMIT 30""")
-    blogs_list = cursor.fetchall()
-    return get_blogs_in_json_format(blogs_list)
+    if stream:
+        return streaming_blogs_response(sample_blog_ids('home', 30), summary)
+
+    def query(db):
+        blog_ids = sample_blog_ids('home', 30)
+        return blogs_response(db, blog_ids, summary)
+
+    return await run_db(query)
 
 
 @app.get('/blogs/{user_id}')
-async def get_blogs_for_home_after_login(user_id: int):
+async def get_blogs_for_home_after_login(user_id: int, stream: bool = False, summary: bool = False):
     """
     Retrieves personalized blogs for the homepage (after login).
 
     Args:
         user_id (int): User ID.
+        stream (bool): Stream the response in batches (default: False).
+        summary (bool): Return only the card fields of each blog (default: False).
 
     Returns:
         list: A list of blog details in JSON format.
     """
-    blog_id_not_to_consider_tuple = get_blogs_not_to_consider(user_id)
-    if blog_id_not_to_consider_tuple is not None:
-        cursor.execute(f""" SELECT * FROM blogs WHERE blog_id ORDER BY RAND() LIMIT 30""")
-    else:
-        cursor.execute(f""" SELECT * FROM blogs WHERE blog_id NOT IN {blog_id_not_to_consider_tuple} 
-                             ORDER BY RAND() LIMIT 30""")
-    blogs_list = cursor.fetchall()
-    return get_blogs_in_json_format(blogs_list)
+    def feed_blog_ids(db):
+        # Liked and favorited blogs are excluded in memory, without querying the likes and favourites
+        return sample_blog_ids('all', 30, exclude=exclusion_sets.get(db, user_id))
+
+    if stream:
+        return streaming_blogs_response(await run_db(feed_blog_ids), summary)
+
+    def query(db):
+        return blogs_response(db, feed_blog_ids(db), summary)
+
+    return await run_db(query)
 
 
 @app.get('/recommended/no/activity/blogs')
-async def get_recommended_blogs_for_user_with_no_activity():
+async def get_recommended_blogs_for_user_with_no_activity(stream: bool = False, summary: bool = False):
     """
     Retrieves top-rated recommended blogs for users with no activity.
 
+    Args:
+        stream (bool): Stream the response in batches (default: False).
+        summary (bool): Return only the card fields of each blog (default: False).
+
     Returns:
         list: A list of recommended blog details in JSON format.
     """
-    top_rated_blogs = ratings_df[ratings_df['ratings'] > 3.5].value_counts().head(30000)
-    top_blog_ids = list(set([x[0] for x in top_rated_blogs.index]))
-    cursor.execute(f""" SELECT * FROM blogs WHERE blog_id IN {tuple(top_blog_ids)} ORDER BY RAND() LIMIT 20""")
-    blogs_list = cursor.fetchall()
-    return get_blogs_in_json_format(blogs_list)
+    if stream:
+        return streaming_blogs_response(sample_blog_ids('no_activity', 20), summary)
+
+    def query(db):
+        blog_ids = sample_blog_ids('no_activity', 20)
+        return blogs_response(db, blog_ids, summary)
+
+    return await run_db(query)
 
 
 @app.get('/recommend/blogs/using/rbm/{user_id}')
-async def get_recommended_blogs_using_rbm(user_id: int):
+async def get_recommended_blogs_using_rbm(user_id: int, stream: bool = False, summary: bool = False):
     """
     Retrieves blog recommendations using the RBM algorithm for the given user ID.
 
     Args:
         user_id (int): User ID.
+        stream (bool): Stream the response in batches, bypassing the response cache (default: False).
+        summary (bool): Return only the card fields of each blog (default: False).
 
     Returns:
         list: A list of recommended blog details in JSON format.
     """
-    path = os.path.abspath('Recommend_Blogs/RecommendedBlogs/top_k_reco.csv')
-    top_reco_df = pd.read_csv(path)
-    top_reco_list = top_reco_df[top_reco_df['userId'] == user_id]['blog_id'].values
-    cursor.execute(f""" SELECT * FROM blogs WHERE blog_id IN {tuple(top_reco_list)}""")
-    blog_list = cursor.fetchall()
-    return get_blogs_in_json_format(blog_list)
+    if stream:
+        return streaming_blogs_response(recommendation_store.get(user_id), summary)
+
+    def query(db):
+        return blogs_response(db, recommendation_store.get(user_id), summary)
+
+    return await cached_response(cache_endpoint('rbm', summary), user_id, query)
 
 
 @app.get('/recommend/similar/blogs/{user_id}')
-async def get_recommended_blogs_using_cosine_similarity(user_id: int):
+async def get_recommended_blogs_using_cosine_similarity(user_id: int, stream: bool = False, summary: bool = False):
     """
     Retrieves blog recommendations using Cosine Similarity for the given user ID.
 
     Args:
         user_id (int): User ID.
+        stream (bool): Stream the response in batches, bypassing the response cache (default: False).
+        summary (bool): Return only the card fields of each blog (default: False).
 
     Returns:
         list: A list of recommended blog details in JSON format.
     """
-    cursor.execute('SELECT * FROM ratings WHERE user_id=%s', [user_id])
-    ratings_list = cursor.fetchall()
-    ratings_json = get_user_ratings_in_json_format(ratings_list)
-    if len(ratings_json) < 3:
-        return []
-    else:
+    def user_ratings(db):
+        cursor = db.cursor()
+        cursor.execute('SELECT * FROM ratings WHERE user_id=%s', [user_id])
+        return get_user_ratings_in_json_format(cursor.fetchall())
+
+    def similar_blog_ids(ratings_json):
+        from Recommend_Blogs import Using_Cosine_Similarity
+
+        if len(ratings_json) < 3:
+            return []
         blogs_json = []
-        recommended_blogs = Using_Cosine_Similarity.get_similar_blog(blogs_json, ratings_json)
-        return get_blogs_for_recommendation(tuple(recommended_blogs))
+        return Using_Cosine_Similarity.get_similar_blog(blogs_json, ratings_json)
+
+    async def recommended_blog_ids():
+        ratings_json = await run_db(user_ratings)
+        # The lookups run after the connection is released, on the default executor: on first use
+        # they wait for the similarity index to be loaded, which must not hold a database thread
+        return await asyncio.get_running_loop().run_in_executor(None, similar_blog_ids, ratings_json)
+
+    if stream:
+        return streaming_blogs_response(await recommended_blog_ids(), summary)
+
+    async def query():
+        return await run_db(blogs_response, await recommended_blog_ids(), summary)
+
+    return await cached_response(cache_endpoint('similar', summary), user_id, query)
 
 
 @app.get('/like/blogs/{user_id}')
-async def get_liked_blogs(user_id: int):
+async def get_liked_blogs(user_id: int, stream: bool = False, summary: bool = False):
     """
     Retrieves a list of blogs liked by the user with the given user ID.
 
     Args:
         user_id (int): User ID.
+        stream (bool): Stream the response in batches, bypassing the response cache (default: False).
+        summary (bool): Return only the card fields of each blog (default: False).
 
     Returns:
         list or dict: A list of liked blogs in JSON format or a message if none are found.
     """
-    cursor.execute(""" SELECT blog_id FROM likes WHERE user_id=%s""", (user_id,))
-    liked_blogs = cursor.fetchall()
-    blog_id_tuple = ()
-    blog_id_list = []
-    blog_json = []
-
-    if liked_blogs:
-        for id in liked_blogs:
-            blog_id_list.append(id[0])
-        blog_id_tuple = tuple(blog_id_list)
-        if len(blog_id_tuple) > 1:
-            cursor.execute(f""" SELECT * FROM blogs WHERE blog_id IN {blog_id_tuple}""")
-        else:
-            cursor.execute(f""" SELECT * FROM blogs WHERE blog_id={blog_id_tuple[0]}""")
-        blogs_list = cursor.fetchall()
-        blog_json = get_blogs_in_json_format(blogs_list)
-        return blog_json
-    else:
-        return {"res": "Not Found"}
+    if stream:
+        blog_ids = await run_db(lambda db: get_user_blog_ids(db, 'likes', user_id))
+        return streaming_blogs_response(blog_ids, summary) if blog_ids else {"res": "Not Found"}
+
+    def query(db):
+        blog_ids = get_user_blog_ids(db, 'likes', user_id)
+        if not blog_ids:
+            return {"res": "Not Found"}
+        return blogs_response(db, blog_ids, summary)
+
+    return await cached_response(cache_endpoint('liked', summary), user_id, query)
 
 
 @app.get('/favourites/blogs/{user_id}')
-async def get_favourites_blogs(user_id: int):
+async def get_favourites_blogs(user_id: int, stream: bool = False, summary: bool = False):
     """
     Retrieves a list of favorite blogs for the user with the given user ID.
 
     Args:
         user_id (int): User ID.
+        stream (bool): Stream the response in batches, bypassing the response cache (default: False).
+        summary (bool): Return only the card fields of each blog (default: False).
 
     Returns:
         list or dict: A list of favorite blogs in JSON format or a message if none are found.
     """
-    cursor.execute("SELECT blog_id FROM favourites WHERE user_id=%s", (user_id,))
-    favourites_blogs = cursor.fetchall()
-    blog_id_tuple = ()
-    blog_id_list = []
-
-    if favourites_blogs:
-        for id in favourites_blogs:
-            blog_id_list.append(id[0])
-        blog_id_tuple = tuple(blog_id_list)
-        if len(blog_id_tuple) > 1:
-            cursor.execute(f""" SELECT * FROM blogs WHERE blog_id IN {blog_id_tuple}""")
-        else:
-            cursor.execute(f""" SELECT * FROM blogs WHERE blog_id={blog_id_tuple[0]}""")
-        blogs_list = cursor.fetchall()
-        return get_blogs_in_json_format(blogs_list)
-    else:
-        return {"res": "Not Found"}
+    if stream:
+        blog_ids = await run_db(lambda db: get_user_blog_ids(db, 'favourites', user_id))
+        return streaming_blogs_response(blog_ids, summary) if blog_ids else {"res": "Not Found"}
+
+    def query(db):
+        blog_ids = get_user_blog_ids(db, 'favourites', user_id)
+        if not blog_ids:
+            return {"res": "Not Found"}
+        return blogs_response(db, blog_ids, summary)
+
+    return await cached_response(cache_endpoint('favourites', summary), user_id, query)
+
+
+@app.get('/blog/{blog_id}')
+async def get_blog(blog_id: int, if_none_match: str = Header(None)):
+    """
+    Retrieves the full details of a blog, with an ETag so that clients can revalidate it.
+
+    Args:
+        blog_id (int): Blog ID.
+        if_none_match (str): ETag of the client's copy, from the If-None-Match header (default: None).
+
+    Returns:
+        Response: The blog in JSON format, or 304 Not Modified if the client's copy is current.
+    """
+    def query(db):
+        blogs_list = get_blogs_by_ids(db, [blog_id])
+        if not blogs_list:
+            return None
+        return orjson.dumps(get_blogs_in_json_format(db, blogs_list)[0])
+
+    body = await run_db(query)
+    if body is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Blog not found")
+
+    etag = blog_etag(body)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(content=body, media_type='application/json', headers={"ETag": etag})
 
 
 @app.post('/content/seen/user/{user_id}/blog/{blog_id}')
@@ -293,7 +628,12 @@ async def seen_blog_content(user_id: int, blog_id: int):
     Returns:
         str: Confirmation message.
     """
-    return add_user_ratings(user_id, blog_id)
+    def on_commit(inserted):
+        if inserted:
+            response_cache.invalidate_user(user_id)
+
+    inserted = await record_interaction('seen', user_id, blog_id, on_commit)
+    return "Already exist" if inserted is False else "seen"
 
 
 @app.post('/likes/user/{user_id}/blog/{blog_id}')
@@ -308,17 +648,14 @@ async def like_blog(user_id: int, blog_id: int):
     Returns:
         str: Confirmation message or "Already exist" if the blog is already liked.
     """
-    cursor.execute(""" SELECT * FROM likes WHERE blog_id=%s AND user_id=%s""", [blog_id, user_id])
-    if cursor.fetchone():
-        return "Already exist"
-    else:
-        curr_time = datetime.now(timezone("Asia/Kolkata")).strftime('%Y-%m-%d %H:%M:%S')
-        datetime_obj = datetime.strptime(curr_time, '%Y-%m-%d %H:%M:%S')
-        cursor.execute(""" INSERT INTO likes(user_id, blog_id, date_created) VALUES (%s, %s, %s)""",
-                       [user_id, blog_id, datetime_obj])
-        mydb.commit()
-        add_user_ratings(user_id, blog_id)
-        return "liked"
+    def on_commit(inserted):
+        if inserted:
+            like_count_index.add(user_id, blog_id, 1)
+            exclusion_sets.add(user_id, 'like', blog_id)
+            response_cache.invalidate_user(user_id)
+
+    inserted = await record_interaction('like', user_id, blog_id, on_commit)
+    return "Already exist" if inserted is False else "liked"
 
 
 @app.delete('/deletelike/user/{user_id}/blog/{blog_id}')
@@ -333,9 +670,17 @@ async def unlike_blog(user_id: int, blog_id: int):
     Returns:
         str: Confirmation message.
     """
-    cursor.execute(""" DELETE FROM likes WHERE user_id=%s AND blog_id=%s""", (user_id, blog_id))
-    mydb.commit()
-    return "unliked"
+    def query(db):
+        cursor = db.cursor()
+        cursor.execute(""" DELETE FROM likes WHERE user_id=%s AND blog_id=%s""", (user_id, blog_id))
+        db.commit()
+        if cursor.rowcount > 0:
+            like_count_index.add(user_id, blog_id, -1)
+            exclusion_sets.remove(user_id, 'like', blog_id)
+            response_cache.invalidate_user(user_id)
+        return "unliked"
+
+    return await run_db(query)
 
 
 @app.post('/favourites/user/{user_id}/blog/{blog_id}')
@@ -350,14 +695,13 @@ async def add_blog_to_favourites(user_id: int, blog_id: int):
     Returns:
         str: Confirmation message or "Already exist" if the blog is already in favorites.
     """
-    cursor.execute(""" SELECT * FROM favourites WHERE blog_id=%s AND user_id=%s""", [blog_id, user_id])
-    if cursor.fetchone():
-        return "Already exist"
-    else:
-        cursor.execute(""" INSERT INTO favourites(user_id, blog_id) VALUES (%s, %s)""", [user_id, blog_id])
-        mydb.commit()
-        add_user_ratings(user_id, blog_id)
-        return "Added to Favourites"
+    def on_commit(inserted):
+        if inserted:
+            exclusion_sets.add(user_id, 'favourite', blog_id)
+            response_cache.invalidate_user(user_id)
+
+    inserted = await record_interaction('favourite', user_id, blog_id, on_commit)
+    return "Already exist" if inserted is False else "Added to Favourites"
 
 
 @app.delete('/removefromfavourites/user/{user_id}/blog/{blog_id}')
@@ -372,9 +716,16 @@ async def remove_blog_from_favourites(user_id: int, blog_id: int):
     Returns:
         str: Confirmation message.
     """
-    cursor.execute(""" DELETE FROM favourites WHERE user_id=%s AND blog_id=%s""", (user_id, blog_id))
-    mydb.commit()
-    return "Removed from Favourites"
+    def query(db):
+        cursor = db.cursor()
+        cursor.execute(""" DELETE FROM favourites WHERE user_id=%s AND blog_id=%s""", (user_id, blog_id))
+        db.commit()
+        if cursor.rowcount > 0:
+            exclusion_sets.remove(user_id, 'favourite', blog_id)
+            response_cache.invalidate_user(user_id)
+        return "Removed from Favourites"
+
+    return await run_db(query)
 
 # To run the application:
 # uvicorn app.main:app --reload
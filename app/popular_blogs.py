@@ -0,0 +1,78 @@
+import threading
+import time
+
+
+class PopularBlogsCache:
+    """
+    Keeps the popular blog pools of the home feeds computed once and refreshed in the background.
+
+    The pools are only ever computed by `refresh_fn`: once at startup, before the server accepts
+    requests, then by the background refresh once they are older than `ttl` seconds or after
+    `invalidate` is called because the ratings changed. Requests never compute them.
+    """
+
+    def __init__(self, refresh_fn, ttl: float):
+        self.refresh_fn = refresh_fn
+        self.ttl = ttl
+        self.computed_at = None
+        self.dirty = False
+        self._lock = threading.Lock()
+        # Held only to update the counters, so that requests never wait for a refresh
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "invalidations": 0}
+
+    def lookup(self):
+        """
+        Records a request for the pools: a hit if they are fresh, a miss if they are stale and
+        waiting for the background refresh.
+        """
+        stale = self.is_stale()
+        with self._stats_lock:
+            self._stats["misses" if stale else "hits"] += 1
+
+    def refresh(self, db):
+        """
+        Recomputes the pools.
+
+        Args:
+            db (MySQLConnection): Database connection
+        """
+        with self._lock:
+            self._refresh(db)
+
+    def _refresh(self, db):
+        self.refresh_fn(db)
+        self.computed_at = time.time()
+        self.dirty = False
+        with self._stats_lock:
+            self._stats["refreshes"] += 1
+
+    def invalidate(self):
+        """
+        Marks the pools as stale so that the next background refresh recomputes them.
+        """
+        self.dirty = True
+        with self._stats_lock:
+            self._stats["invalidations"] += 1
+
+    def age(self):
+        return None if self.computed_at is None else time.time() - self.computed_at
+
+    def is_stale(self):
+        return self.computed_at is None or self.dirty or self.age() > self.ttl
+
+    def stats(self):
+        """
+        Returns the cache hit/miss counters and staleness.
+
+        Returns:
+            stats (dict): Counters, hit rate, age in seconds and whether the pools are stale
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["age_seconds"] = self.age()
+        stats["stale"] = self.is_stale()
+        stats["ttl_seconds"] = self.ttl
+        return stats
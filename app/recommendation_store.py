@@ -0,0 +1,67 @@
+import threading
+import numpy as np
+from Recommend_Blogs.Data_Store import TOP_K_DTYPES, dataset_mtime, read_dataset
+
+
+class RecommendationStore:
+    """
+    In-memory index of the top-K RBM recommendations of every user.
+
+    Recommendations are stored CSR-style: `user_ids` is the sorted array of users, and the
+    recommended blogs of user_ids[i] are blog_ids[indptr[i]:indptr[i + 1]], best first.
+    A reload builds new arrays and swaps them in with a single assignment, so lookups never
+    see a half-loaded file and never touch the disk.
+    """
+
+    def __init__(self, path: str):
+        # Path of the recommendations CSV; the data is read from its Parquet version
+        self.path = path
+        self.mtime = None
+        self._data = (np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self._reload_lock = threading.Lock()
+
+    def load(self):
+        """
+        Loads the recommendations and atomically replaces the current index.
+        """
+        with self._reload_lock:
+            top_reco_df = read_dataset(self.path, TOP_K_DTYPES, columns=['userId', 'blog_id', 'prediction'])
+            mtime = dataset_mtime(self.path)
+            top_reco_df = top_reco_df.sort_values(['userId', 'prediction'], ascending=[True, False], kind='stable')
+
+            users = top_reco_df['userId'].to_numpy(dtype=np.int64)
+            user_ids, starts = np.unique(users, return_index=True)
+            indptr = np.append(starts, len(users)).astype(np.int64)
+            blog_ids = top_reco_df['blog_id'].to_numpy(dtype=np.int64)
+
+            self._data = (user_ids, indptr, blog_ids)
+            self.mtime = mtime
+
+    def reload_if_changed(self):
+        """
+        Reloads the index if the recommendations were rewritten since the last load.
+
+        Returns:
+            bool: True if the index was reloaded
+        """
+        mtime = dataset_mtime(self.path)
+        if mtime is None or mtime == self.mtime:
+            return False
+        self.load()
+        return True
+
+    def get(self, user_id: int):
+        """
+        Returns the recommended blog IDs of a user.
+
+        Args:
+            user_id (int): User ID
+
+        Returns:
+            blog_ids (list): Recommended blog IDs, best first (empty for unknown users)
+        """
+        user_ids, indptr, blog_ids = self._data
+        pos = np.searchsorted(user_ids, user_id)
+        if pos == len(user_ids) or user_ids[pos] != user_id:
+            return []
+        return blog_ids[indptr[pos]:indptr[pos + 1]].tolist()
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of per-user endpoint responses, keyed by (endpoint, user ID).
+
+    Entries expire `ttl` seconds after they are stored and the least recently used entries are
+    evicted beyond `max_entries`. The endpoints that change a user's likes, favourites or ratings
+    call `invalidate_user`, which drops the user's entries and records the time of the change so
+    that a response computed concurrently with it is not stored. A response computed more than
+    `ttl` seconds ago is never stored either, so the change times only have to be kept for `ttl`
+    seconds.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._user_endpoints = {}
+        # Time of the last invalidation of each user, oldest first
+        self._invalidated_at = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        self._endpoint_stats = {}
+
+    def get(self, endpoint: str, user_id: int):
+        """
+        Returns the cached response of an endpoint for a user.
+
+        Args:
+            endpoint (str): Name of the endpoint
+            user_id (int): User ID
+
+        Returns:
+            response: The cached response, or None on a miss
+        """
+        key = (endpoint, user_id)
+        with self._lock:
+            endpoint_stats = self._endpoint_stats.setdefault(endpoint, {"hits": 0, "misses": 0})
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                endpoint_stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            endpoint_stats["hits"] += 1
+            return entry[1]
+
+    def start_time(self):
+        """
+        Returns the current time, to be read before computing a response and passed to `put` with it.
+        """
+        return time.monotonic()
+
+    def put(self, endpoint: str, user_id: int, response, started_at: float):
+        """
+        Stores a response, unless the user's data was invalidated since its computation started.
+
+        Args:
+            endpoint (str): Name of the endpoint
+            user_id (int): User ID
+            response: The response
+            started_at (float): Value of `start_time()` read before computing the response
+        """
+        key = (endpoint, user_id)
+        now = time.monotonic()
+        with self._lock:
+            if now - started_at > self.ttl or self._invalidated_at.get(user_id, float("-inf")) >= started_at:
+                return
+            self._entries[key] = (now + self.ttl, response)
+            self._entries.move_to_end(key)
+            self._user_endpoints.setdefault(user_id, set()).add(endpoint)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _remove(self, key):
+        endpoint, user_id = key
+        del self._entries[key]
+        endpoints = self._user_endpoints.get(user_id)
+        if endpoints is not None:
+            endpoints.discard(endpoint)
+            if not endpoints:
+                del self._user_endpoints[user_id]
+
+    def invalidate_user(self, user_id: int):
+        """
+        Drops every cached response of a user.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._invalidated_at[user_id] = now
+            self._invalidated_at.move_to_end(user_id)
+            # Changes older than the TTL can no longer be raced by a response being computed
+            while next(iter(self._invalidated_at.values())) < now - self.ttl:
+                self._invalidated_at.popitem(last=False)
+            for endpoint in list(self._user_endpoints.get(user_id, ())):
+                self._remove((endpoint, user_id))
+            self._stats["invalidations"] += 1
+
+    def invalidate_endpoint(self, endpoint: str):
+        """
+        Drops the cached responses of an endpoint for every user, e.g. after the data behind it was reloaded.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == endpoint]:
+                self._remove(key)
+            self._stats["invalidations"] += 1
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            stats (dict): Counters, overall and per-endpoint hit rates, size and limits
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            endpoints = {endpoint: dict(counts) for endpoint, counts in self._endpoint_stats.items()}
+            stats["size"] = len(self._entries)
+            stats["recently_invalidated_users"] = len(self._invalidated_at)
+        for counts in [stats] + list(endpoints.values()):
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = counts["hits"] / lookups if lookups else 0.0
+        stats["endpoints"] = endpoints
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl
+        return stats
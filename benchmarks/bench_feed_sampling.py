@@ -0,0 +1,72 @@
+"""
+Compares ORDER BY RANDOM() LIMIT n with FeedSampler + primary key fetch as the blogs table grows.
+
+SQLite stands in for MySQL so that the benchmark runs without a database server; both
+engines have to read and sort the whole candidate set for ORDER BY RAND()/RANDOM().
+
+Usage:
+python -m benchmarks.bench_feed_sampling --sizes 1000 10000 100000
+"""
+import argparse
+import importlib.util
+import os
+import sqlite3
+import time
+
+
+def load_feed_sampler():
+    # Loaded from its file: importing the app package would load the API and the ratings
+    path = os.path.join(os.path.dirname(__file__), os.pardir, "app", "feed_sampler.py")
+    spec = importlib.util.spec_from_file_location("feed_sampler", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.FeedSampler
+
+
+def create_blogs_table(n_blogs: int, content_size: int):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE blogs (blog_id INTEGER PRIMARY KEY, title TEXT, blog_content TEXT, topic TEXT)")
+    content = "x" * content_size
+    db.executemany("INSERT INTO blogs VALUES (?, ?, ?, ?)",
+                   ((i, f"title {i}", content, "topic") for i in range(1, n_blogs + 1)))
+    db.commit()
+    return db
+
+
+def time_per_call(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return 1000 * (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--page-size', type=int, default=30)
+    parser.add_argument('--content-size', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    FeedSampler = load_feed_sampler()
+    print(f"{'blogs':>10}{'ORDER BY RANDOM (ms)':>24}{'sampler + PK (ms)':>22}")
+    for n_blogs in args.sizes:
+        db = create_blogs_table(n_blogs, args.content_size)
+        sampler = FeedSampler(seed=0)
+        sampler.set_pool('all', (row[0] for row in db.execute("SELECT blog_id FROM blogs")))
+
+        def order_by_random():
+            db.execute("SELECT * FROM blogs ORDER BY RANDOM() LIMIT ?", [args.page_size]).fetchall()
+
+        def sample_by_key():
+            blog_ids = sampler.sample('all', args.page_size)
+            placeholders = ", ".join("?" * len(blog_ids))
+            db.execute(f"SELECT * FROM blogs WHERE blog_id IN ({placeholders})", blog_ids).fetchall()
+
+        print(f"{n_blogs:>10}{time_per_call(order_by_random, args.repeat):>24.2f}"
+              f"{time_per_call(sample_by_key, args.repeat):>22.2f}")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Profiles the import time of the API, i.e. the cold start of every uvicorn worker, with `python -X importtime`.
+
+The heavy modules that the API now loads lazily (NLTK, scikit-learn and the cosine similarity
+recommender) are profiled in a separate interpreter, on top of the API imports, to show how
+much they used to add to the startup of each worker.
+
+Usage:
+python -m benchmarks.bench_import_time --top 15
+"""
+import argparse
+import subprocess
+import sys
+
+API_MODULE = "app.main"
+DEFERRED_MODULES = [
+    "nltk.corpus",
+    "nltk.stem",
+    "sklearn.feature_extraction.text",
+    "Recommend_Blogs.Using_Cosine_Similarity",
+]
+
+
+def import_profile(modules: list):
+    """
+    Imports modules in a fresh interpreter and returns the import time of every module.
+
+    Returns:
+    list: (module, self time in ms, cumulative time in ms, depth) tuples in import order.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    profile = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        profile.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return profile
+
+
+def total_ms(profile):
+    # Top-level imports include the time of everything they import
+    return sum(cumulative for _, _, cumulative, depth in profile if depth == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--top', type=int, default=15, help="number of slowest modules to show")
+    args = parser.parse_args()
+
+    api_profile = import_profile([API_MODULE])
+    api_ms = total_ms(api_profile)
+    print(f"import {API_MODULE}: {api_ms:.0f} ms")
+    print(f"\n{'module':<50}{'self ms':>10}{'cumulative ms':>15}")
+    for name, self_ms, cumulative_ms, _ in sorted(api_profile, key=lambda row: -row[1])[:args.top]:
+        print(f"{name:<50}{self_ms:>10.1f}{cumulative_ms:>15.1f}")
+
+    # Importing the deferred modules after the API only counts what the API does not already import
+    eager_ms = total_ms(import_profile([API_MODULE] + DEFERRED_MODULES))
+    print(f"\nimport {API_MODULE} + deferred modules: {eager_ms:.0f} ms")
+    print(f"saved per worker at startup: {eager_ms - api_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
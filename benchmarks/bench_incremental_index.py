@@ -0,0 +1,81 @@
+"""
+Checks that adding blogs to a similarity index gives the same neighbour table as building the
+index on the combined corpus, and reports how the time of an addition evolves as the index grows.
+
+The index is built on the first blogs of a synthetic corpus and the rest is added in batches.
+Exits with a non-zero status if the tables differ.
+
+Usage:
+python -m benchmarks.bench_incremental_index --n-blogs 20000 --initial 5000 --batch 500
+"""
+import argparse
+import sys
+import time
+import numpy as np
+from benchmarks.bench_similarity_backends import synthetic_corpus
+from Recommend_Blogs.Similarity_Index import index_from_corpus
+
+
+def rows_match(neighbours, scores, other_neighbours, other_scores, atol: float = 1e-5):
+    """
+    Compares two neighbour lists of the same blog, given as blog IDs.
+
+    The vectors are summed in a different order by both builds, so scores may differ by float32
+    rounding and neighbours with (nearly) equal scores may come in another order or, at the end
+    of the list, be replaced by one another.
+    """
+    if not np.allclose(scores, other_scores, atol=atol):
+        return False
+    kept = neighbours >= 0
+    if not kept.any():
+        return not (other_neighbours >= 0).any()
+    # Blogs scored clearly above the last kept neighbour must be in both lists
+    cutoff = scores[kept].min() + atol
+    return (set(neighbours[kept & (scores > cutoff)]) ==
+            set(other_neighbours[(other_neighbours >= 0) & (other_scores > cutoff)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-blogs', type=int, default=20000)
+    parser.add_argument('--initial', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--top-k', type=int, default=50)
+    args = parser.parse_args()
+
+    docs = synthetic_corpus(args.n_blogs)
+    blog_ids = np.arange(1, args.n_blogs + 1)
+
+    start = time.perf_counter()
+    index = index_from_corpus(blog_ids[:args.initial], docs[:args.initial], top_k=args.top_k, backend='exact')
+    print(f"Initial build of {args.initial} blogs: {time.perf_counter() - start:.2f}s")
+
+    print(f"{'blogs':>8}{'add ms':>10}")
+    for batch_start in range(args.initial, args.n_blogs, args.batch):
+        batch_end = min(batch_start + args.batch, args.n_blogs)
+        start = time.perf_counter()
+        index.add_blogs(blog_ids[batch_start:batch_end], docs[batch_start:batch_end])
+        print(f"{batch_end:>8}{1000 * (time.perf_counter() - start):>10.1f}")
+
+    start = time.perf_counter()
+    full = index_from_corpus(blog_ids, docs, top_k=args.top_k, backend='exact')
+    print(f"Full build of {args.n_blogs} blogs: {time.perf_counter() - start:.2f}s")
+
+    # Rows are compared by blog ID, the blog positions may differ between both indexes
+    full_rows = {blog_id: pos for pos, blog_id in enumerate(full.blog_ids.tolist())}
+    mismatches = []
+    for pos, blog_id in enumerate(index.blog_ids.tolist()):
+        full_pos = full_rows[blog_id]
+        neighbours = np.where(index.neighbours[pos] >= 0, index.blog_ids[index.neighbours[pos]], -1)
+        full_neighbours = np.where(full.neighbours[full_pos] >= 0, full.blog_ids[full.neighbours[full_pos]], -1)
+        if not rows_match(neighbours, index.scores[pos], full_neighbours, full.scores[full_pos]):
+            mismatches.append(blog_id)
+
+    if mismatches:
+        print(f"Neighbour tables differ for {len(mismatches)} blogs, e.g. {mismatches[:10]}")
+        sys.exit(1)
+    print(f"Neighbour tables match for all {len(index.blog_ids)} blogs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Compares the per-click write path of the like endpoint (SELECT + INSERT + commit for the like,
+then again for the rating) with the InteractionWriter group commits.
+
+SQLite on disk, with synchronous=FULL so that every commit is an fsync, stands in for MySQL.
+The writer's MySQL statements are translated to SQLite syntax by a thin connection wrapper.
+
+Usage:
+python -m benchmarks.bench_interaction_writes --events 2000 --clients 16
+"""
+import argparse
+import importlib.util
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def load_interaction_writer():
+    # Loaded from its file: importing the app package would load the API and the ratings
+    path = os.path.join(os.path.dirname(__file__), os.pardir, "app", "interaction_writer.py")
+    spec = importlib.util.spec_from_file_location("interaction_writer", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.InteractionWriter
+
+
+class SQLiteCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, statement, params=()):
+        statement = statement.replace("INSERT IGNORE", "INSERT OR IGNORE").replace("%s", "?")
+        self._cursor.execute(statement, params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+
+class SQLiteConnection:
+    """
+    Exposes a SQLite connection with the MySQL statement syntax used by the API.
+    """
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.execute("PRAGMA synchronous=FULL")
+
+    def cursor(self):
+        return SQLiteCursor(self._db.cursor())
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+
+def create_database(path):
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE likes (user_id INTEGER, blog_id INTEGER, date_created TEXT, UNIQUE(user_id, blog_id))")
+    db.execute("CREATE TABLE favourites (user_id INTEGER, blog_id INTEGER, UNIQUE(user_id, blog_id))")
+    db.execute("CREATE TABLE ratings (user_id INTEGER, blog_id INTEGER, rating REAL, timestamp TEXT, "
+               "UNIQUE(user_id, blog_id))")
+    db.commit()
+    db.close()
+
+
+def per_click_likes(db, events):
+    # The like endpoint before the change: 4 statements and 2 commits per click
+    now = datetime.now().isoformat()
+    for user_id, blog_id in events:
+        cursor = db.cursor()
+        cursor.execute("SELECT * FROM likes WHERE blog_id=%s AND user_id=%s", [blog_id, user_id])
+        if cursor.fetchone():
+            continue
+        cursor.execute("INSERT INTO likes(user_id, blog_id, date_created) VALUES (%s, %s, %s)",
+                       [user_id, blog_id, now])
+        db.commit()
+        cursor.execute("SELECT * FROM ratings WHERE blog_id=%s AND user_id=%s", [blog_id, user_id])
+        if not cursor.fetchone():
+            cursor.execute("INSERT INTO ratings(user_id, blog_id, rating, timestamp) VALUES (%s, %s, %s, %s)",
+                           [user_id, blog_id, 0.5, now])
+            db.commit()
+
+
+def group_commit_likes(writer, events, clients: int, wait: bool):
+    # Every client thread submits its share of the events, waiting for each commit in sync mode
+    now = datetime.now()
+
+    def client(client_events):
+        for user_id, blog_id in client_events:
+            future = writer.submit("like", user_id, blog_id, now)
+            if wait:
+                future.result()
+
+    threads = [threading.Thread(target=client, args=(events[i::clients],)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--max-delay', type=float, default=0.0)
+    args = parser.parse_args()
+
+    InteractionWriter = load_interaction_writer()
+    events = [(i % 500, i) for i in range(args.events)]
+
+    print(f"{'write path':<32}{'events/s':>10}{'commits':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "per_click.db")
+        create_database(path)
+        start = time.perf_counter()
+        per_click_likes(SQLiteConnection(path), events)
+        print(f"{'per click (SELECT/INSERT/commit)':<32}{args.events / (time.perf_counter() - start):>10.0f}"
+              f"{args.events * 2:>9}")
+
+        for durability in ("sync", "buffered"):
+            path = os.path.join(tmp_dir, f"{durability}.db")
+            create_database(path)
+            connection = SQLiteConnection(path)
+
+            @contextmanager
+            def connect():
+                yield connection
+
+            writer = InteractionWriter(connect, durability,
+                                       batch_size=args.batch_size, max_delay=args.max_delay)
+            start = time.perf_counter()
+            group_commit_likes(writer, events, args.clients, wait=durability == "sync")
+            elapsed = time.perf_counter() - start
+            stats = writer.stats()
+            label = f"group commit ({durability}, {args.clients} clients)"
+            print(f"{label:<32}{args.events / elapsed:>10.0f}{stats['batches']:>9}")
+
+
+if __name__ == '__main__':
+    main()
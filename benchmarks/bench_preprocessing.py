@@ -0,0 +1,65 @@
+"""
+Measures text pre-processing throughput in docs/sec.
+
+Compares the former per-row path (a new lemmatizer per call, list stopword lookups and
+DataFrame.apply) with preprocess_corpus in a single process and across a process pool.
+
+Usage:
+python -m benchmarks.bench_preprocessing --n-docs 20000 --n-jobs 4
+"""
+import argparse
+import os
+import re
+import time
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from Recommend_Blogs.Similarity_Index import data_file
+from Recommend_Blogs.Text_Preprocessing import preprocess_corpus
+from benchmarks.bench_similarity_backends import synthetic_corpus
+
+
+def per_row_pre_process_text(text, lst_stopwords=None):
+    """
+    The pre-processing as it was done before preprocess_corpus.
+    """
+    text = re.sub(r'[^\w\s]', '', str(text).lower().strip())
+    lst_text = text.split()
+    if lst_stopwords is not None:
+        lst_text = [word for word in lst_text if word not in lst_stopwords]
+    lemmatizer = WordNetLemmatizer()
+    return " ".join(lemmatizer.lemmatize(word) for word in lst_text)
+
+
+def report(name, n_docs, elapsed):
+    print(f"{name:<28}{elapsed:>10.2f}s{n_docs / elapsed:>14.0f} docs/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-docs', type=int, default=20000)
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if os.path.exists(data_file):
+        texts = pd.read_csv(data_file)['content'].fillna('').tolist()[:args.n_docs]
+    else:
+        texts = synthetic_corpus(args.n_docs)
+    lst_stopwords = stopwords.words('english')
+    print(f"Corpus: {len(texts)} docs")
+
+    start = time.perf_counter()
+    pd.Series(texts).apply(lambda x: per_row_pre_process_text(x, lst_stopwords))
+    report("per-row apply", len(texts), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    preprocess_corpus(texts, lst_stopwords=lst_stopwords, n_jobs=1)
+    report("preprocess_corpus", len(texts), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    preprocess_corpus(texts, lst_stopwords=lst_stopwords, n_jobs=args.n_jobs)
+    report(f"preprocess_corpus n_jobs={args.n_jobs}", len(texts), time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
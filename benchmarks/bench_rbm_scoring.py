@@ -0,0 +1,99 @@
+"""
+Checks that scoring the users in blocks gives the same recommendations as scoring them all at once,
+and reports the scoring time and peak memory of each block size.
+
+The model is a stand-in with the scoring of the recommenders RBM: `fit` sets `seen_mask` over the
+whole training matrix and `recommend_k_items` zeroes the scores of `seen_mask` before taking the
+top K, so the check runs without TensorFlow. Exits with a non-zero status if the recommendations
+differ or include a blog the user already rated.
+
+Usage:
+python -m benchmarks.bench_rbm_scoring --users 5000 --blogs 2000 --chunk-sizes 256,1024,5000
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.bench_rbm_training import synthetic_ratings
+from Recommend_Blogs.RBM_Training import dense_rows, top_k_chunks
+
+
+class FakeRBM:
+    """
+    Scores the blogs with a fixed random projection of the ratings, masked like the recommenders RBM.
+    """
+
+    def __init__(self, n_blogs: int, hidden_units: int = 64, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.w = rng.standard_normal((n_blogs, hidden_units)).astype(np.float32)
+        self.seen_mask = None
+
+    def fit(self, xtr):
+        self.seen_mask = np.not_equal(xtr, 0)
+
+    def recommend_k_items(self, x, top_k: int = 10, remove_seen: bool = True):
+        score = 1 / (1 + np.exp(-(x @ self.w) @ self.w.T / self.w.shape[1]))
+        if remove_seen:
+            score[self.seen_mask] = 0
+        top_items = np.argpartition(-score, range(top_k), axis=1)[:, :top_k]
+        score_c = score.copy()
+        score_c[np.arange(score_c.shape[0])[:, None], top_items] = 0
+        return score - score_c
+
+
+def score(args, chunk_size: int):
+    X = synthetic_ratings(args.users, args.blogs, args.density)
+    user_ids = np.arange(1, X.shape[0] + 1)
+    item_ids = np.arange(1, X.shape[1] + 1)
+    model = FakeRBM(X.shape[1])
+    model.fit(dense_rows(X))
+
+    start = time.perf_counter()
+    recommendations = pd.concat(list(top_k_chunks(model, X, X, user_ids, item_ids, args.k, chunk_size)))
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return recommendations, elapsed, peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--blogs', type=int, default=2000)
+    parser.add_argument('--density', type=float, default=0.01)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--chunk-sizes', default='256,1024,5000')
+    args = parser.parse_args()
+
+    X = synthetic_ratings(args.users, args.blogs, args.density)
+    seen = set(zip(*[index + 1 for index in X.nonzero()]))
+
+    print(f"{'chunk':>8}{'s':>8}{'peak MB':>10}")
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for chunk_size in [int(size) for size in args.chunk_sizes.split(',')]:
+        with context.Pool(1) as pool:
+            recommendations, elapsed, peak_mb = pool.apply(score, (args, chunk_size))
+        print(f"{chunk_size:>8}{elapsed:>8.2f}{peak_mb:>10.0f}")
+        results[chunk_size] = recommendations.sort_values(['userId', 'blog_id']).reset_index(drop=True)
+
+    failed = False
+    reference_size = max(results)
+    for chunk_size, recommendations in results.items():
+        if not recommendations.equals(results[reference_size]):
+            print(f"Recommendations scored in blocks of {chunk_size} differ from blocks of {reference_size}")
+            failed = True
+        if any(pair in seen for pair in zip(recommendations['userId'], recommendations['blog_id'])):
+            print(f"Recommendations scored in blocks of {chunk_size} include rated blogs")
+            failed = True
+    if failed:
+        sys.exit(1)
+    print("Block scoring matches")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures the RBM training time per epoch and the peak memory on a synthetic ratings matrix.
+
+Every combination of minibatch size and thread count is trained in a fresh process, so the
+thread settings apply and the peak memory of one run does not hide the next one.
+
+Usage:
+python -m benchmarks.bench_rbm_training --users 5000 --blogs 2000 --density 0.01 \
+    --minibatch-sizes 100,350,1000 --threads 1,4,0
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+import numpy as np
+from scipy import sparse
+
+RATINGS = np.array([1, 2, 3.5, 5], dtype=np.float32)
+
+
+def synthetic_ratings(n_users: int, n_blogs: int, density: float, seed: int = 0):
+    """
+    Returns a random CSR ratings matrix with every user rating at least one blog.
+    """
+    rng = np.random.default_rng(seed)
+    n_ratings = max(n_users, int(n_users * n_blogs * density))
+    rows = np.concatenate([np.arange(n_users), rng.integers(0, n_users, n_ratings - n_users)])
+    cols = rng.integers(0, n_blogs, n_ratings)
+    X = sparse.csr_matrix((rng.choice(RATINGS, n_ratings), (rows, cols)), shape=(n_users, n_blogs))
+    # Duplicate (user, blog) pairs are summed by the constructor, keep a single valid rating instead
+    X.data = rng.choice(RATINGS, len(X.data))
+    return X
+
+
+def train(args, minibatch_size: int, threads: int):
+    from Recommend_Blogs.RBM_Training import configure_tensorflow, dense_rows, make_rbm
+
+    device = configure_tensorflow(args.device, intra_op_threads=threads, inter_op_threads=min(threads, 2))
+    import tensorflow as tf
+
+    X = synthetic_ratings(args.users, args.blogs, args.density)
+    X_train = dense_rows(X)
+    with tf.device(device):
+        model = make_rbm(X, visible_units=X.shape[1], training_epoch=args.epochs, hidden_units=args.hidden_units,
+                         minibatch_size=minibatch_size, n_rows=X.shape[0], with_metrics=False)
+        start = time.perf_counter()
+        model.fit(X_train)
+        elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return elapsed / args.epochs, peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--blogs', type=int, default=2000)
+    parser.add_argument('--density', type=float, default=0.01)
+    parser.add_argument('--hidden-units', type=int, default=1200)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--device', default='cpu', choices=['cpu', 'gpu'])
+    parser.add_argument('--minibatch-sizes', default='100,350,1000')
+    parser.add_argument('--threads', default='0', help="intra-op thread counts to try, 0 is the TensorFlow default")
+    args = parser.parse_args()
+
+    X = synthetic_ratings(args.users, args.blogs, args.density)
+    dense_mb = X.shape[0] * X.shape[1] * 4 / 2 ** 20
+    sparse_mb = (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 2 ** 20
+    print(f"ratings matrix: {X.shape[0]} users x {X.shape[1]} blogs, {X.nnz} ratings, "
+          f"dense float32 {dense_mb:.1f} MB, CSR {sparse_mb:.1f} MB")
+
+    print(f"{'minibatch':>10}{'threads':>9}{'s/epoch':>10}{'peak MB':>10}")
+    context = multiprocessing.get_context('spawn')
+    for minibatch_size in [int(size) for size in args.minibatch_sizes.split(',')]:
+        for threads in [int(count) for count in args.threads.split(',')]:
+            with context.Pool(1) as pool:
+                epoch_time, peak_mb = pool.apply(train, (args, minibatch_size, threads))
+            print(f"{minibatch_size:>10}{threads or 'auto':>9}{epoch_time:>10.2f}{peak_mb:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
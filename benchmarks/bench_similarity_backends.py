@@ -0,0 +1,80 @@
+"""
+Compares the exact and the IVF (approximate) similarity backends.
+
+Reports build time, per-query latency and recall@10 against the exact search for several
+values of n_probe, on the blog corpus if it exists or on a synthetic topic-clustered corpus.
+
+Usage:
+python -m benchmarks.bench_similarity_backends --n-blogs 20000 --n-probe 1 4 8 16
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+from Recommend_Blogs.Nearest_Neighbours import ExactSearch, IVFSearch
+from Recommend_Blogs.Similarity_Index import data_file
+
+
+def synthetic_corpus(n_blogs: int, n_topics: int = 50, vocab_size: int = 20000, doc_len: int = 150, seed: int = 0):
+    """
+    Generates documents drawn from topic-specific Zipfian word distributions.
+    """
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, vocab_size + 1)
+    base = 1.0 / ranks
+    topic_words = [rng.permutation(vocab_size) for _ in range(n_topics)]
+    docs = []
+    for topic in rng.integers(0, n_topics, n_blogs):
+        words = topic_words[topic][rng.choice(vocab_size, doc_len, p=base / base.sum())]
+        docs.append(" ".join(f"w{w}" for w in words))
+    return docs
+
+
+def recall_at_k(exact, approx):
+    hits = [len(set(e[e >= 0]) & set(a[a >= 0])) / max(1, (e >= 0).sum()) for e, a in zip(exact, approx)]
+    return float(np.mean(hits))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-blogs', type=int, default=20000)
+    parser.add_argument('--n-queries', type=int, default=500)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--synthetic', action='store_true', help="Ignore the blog corpus on disk")
+    args = parser.parse_args()
+
+    if os.path.exists(data_file) and not args.synthetic:
+        docs = pd.read_csv(data_file)['clean_blog_content'].fillna('').tolist()
+    else:
+        docs = synthetic_corpus(args.n_blogs)
+
+    vectors = normalize(CountVectorizer().fit_transform(docs).astype(np.float32)).tocsr()
+    rng = np.random.default_rng(1)
+    query_rows = np.sort(rng.choice(vectors.shape[0], min(args.n_queries, vectors.shape[0]), replace=False))
+    queries = vectors[query_rows]
+    print(f"Corpus: {vectors.shape[0]} blogs, {vectors.shape[1]} terms, {len(query_rows)} queries")
+
+    exact = ExactSearch().fit(vectors)
+    start = time.perf_counter()
+    exact_neighbours, _ = exact.query(queries, 10)
+    exact_latency = (time.perf_counter() - start) / len(query_rows)
+    print(f"{'backend':<16}{'build (s)':>12}{'query (ms)':>12}{'recall@10':>12}")
+    print(f"{'exact':<16}{0:>12.2f}{exact_latency * 1000:>12.3f}{1:>12.3f}")
+
+    start = time.perf_counter()
+    ivf = IVFSearch().fit(vectors)
+    build_time = time.perf_counter() - start
+    for n_probe in args.n_probe:
+        ivf.n_probe = n_probe
+        start = time.perf_counter()
+        ivf_neighbours, _ = ivf.query(queries, 10)
+        latency = (time.perf_counter() - start) / len(query_rows)
+        print(f"{'ivf n_probe=' + str(n_probe):<16}{build_time:>12.2f}{latency * 1000:>12.3f}"
+              f"{recall_at_k(exact_neighbours, ivf_neighbours):>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
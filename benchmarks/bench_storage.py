@@ -0,0 +1,56 @@
+"""
+Compares the load time of the datasets as CSV and as typed Parquet files.
+
+The Parquet copies are written to a temporary directory, the datasets themselves are not modified.
+
+Usage:
+python -m benchmarks.bench_storage --repeat 5
+"""
+import argparse
+import os
+import tempfile
+import time
+import pandas as pd
+from Recommend_Blogs.Data_Store import (BLOG_DATA_DTYPES, RATINGS_DTYPES, TOP_K_DTYPES, read_dataset,
+                                        columnar_path)
+
+DATASETS = [
+    ("blog_data", "Recommend_Blogs/BlogData/blog_data.csv", BLOG_DATA_DTYPES),
+    ("ratings", "app/ratings/blog_ratings_V4.csv", RATINGS_DTYPES),
+    ("ratings (sample)", "app/ratings/blog_ratings.csv", RATINGS_DTYPES),
+    ("top_k_reco", "Recommend_Blogs/RecommendedBlogs/top_k_reco.csv", TOP_K_DTYPES),
+]
+
+
+def best_time(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'dataset':<18}{'rows':>10}{'CSV (ms)':>12}{'Parquet (ms)':>14}{'CSV MB':>10}{'Parquet MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, csv_path, dtypes in DATASETS:
+            if not os.path.exists(csv_path):
+                continue
+            tmp_csv_path = os.path.join(tmp_dir, os.path.basename(csv_path))
+            pd.read_csv(csv_path).to_csv(tmp_csv_path, index=False)
+            rows = len(read_dataset(tmp_csv_path, dtypes))
+
+            csv_ms = best_time(lambda: pd.read_csv(tmp_csv_path), args.repeat)
+            parquet_ms = best_time(lambda: read_dataset(tmp_csv_path, dtypes), args.repeat)
+            csv_mb = os.path.getsize(tmp_csv_path) / 2 ** 20
+            parquet_mb = os.path.getsize(columnar_path(tmp_csv_path)) / 2 ** 20
+            print(f"{name:<18}{rows:>10}{csv_ms:>12.1f}{parquet_ms:>14.1f}{csv_mb:>10.2f}{parquet_mb:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
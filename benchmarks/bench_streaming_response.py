@@ -0,0 +1,160 @@
+"""
+Compares the peak memory and time to first byte of a blog list response built in full (fetchall,
+a list of dicts, then JSON encoding, as FastAPI does) with the streaming mode of the list
+endpoints (one short query per batch of IDs, encoded with orjson and sent before the next batch
+is fetched), and of the summary responses that only select the card columns.
+
+The responses are built by the API's own functions (`blogs_response` and
+`stream_blogs_in_json_format`) on a SQLite database that stands in for MySQL; the API's MySQL
+statements are translated to SQLite syntax by a thin connection wrapper.
+
+Usage:
+python -m benchmarks.bench_streaming_response --blogs 20000 --content-size 4000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import orjson
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def load_app(work_dir):
+    # The app package loads the ratings on import; it is imported from a scratch working directory
+    # holding an empty ratings file, as the responses measured here do not use the ratings
+    os.makedirs(os.path.join(work_dir, "app", "ratings"))
+    with open(os.path.join(work_dir, "app", "ratings", "blog_ratings_V4.csv"), "w") as f:
+        f.write("userId,blog_id,ratings\n")
+    sys.path.insert(0, REPO_ROOT)
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    # Every blog has no like, without loading the like counts from the likes table
+    app.like_count_index._counts = {}
+    app.like_count_index.loaded = True
+    return app
+
+
+class SQLiteCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, statement, params=()):
+        self._cursor.execute(statement.replace("%s", "?"), params)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+
+class SQLiteConnection:
+    """
+    Exposes a SQLite connection with the MySQL statement syntax used by the API.
+    """
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path)
+
+    def cursor(self):
+        return SQLiteCursor(self._db.cursor())
+
+    def close(self):
+        self._db.close()
+
+
+def create_database(path, blogs: int, content_size: int):
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE author (author_id INTEGER PRIMARY KEY, author_name TEXT)")
+    db.execute("CREATE TABLE blogs (blog_id INTEGER PRIMARY KEY, author_id INTEGER, title TEXT, blog_content TEXT, "
+               "content_link TEXT, image TEXT, topic TEXT, scrape_time TEXT)")
+    db.executemany("INSERT INTO author VALUES (?, ?)", [(i, f"Author {i}") for i in range(100)])
+    content = "x" * content_size
+    db.executemany("INSERT INTO blogs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                   [(i, i % 100, f"Title {i}", content, f"https://example.com/{i}", f"https://example.com/{i}.png",
+                     "Technology", "2023-01-01 00:00:00") for i in range(blogs)])
+    db.commit()
+    db.close()
+
+
+def full_response(app, db, blog_ids):
+    # The whole list is fetched, converted and encoded before the first byte is sent
+    yield json.dumps(app.blogs_response(db, blog_ids)).encode()
+
+
+def summary_response(app, db, blog_ids):
+    # Only the card columns are read and sent, without the content of the blogs
+    yield json.dumps(app.blogs_response(db, blog_ids, summary=True)).encode()
+
+
+def streaming_response(app, db, blog_ids):
+    return app.stream_blogs_in_json_format(blog_ids)
+
+
+def streaming_summary_response(app, db, blog_ids):
+    return app.stream_blogs_in_json_format(blog_ids, summary=True)
+
+
+def measure(app, response, path, blog_ids):
+    @contextmanager
+    def get_connection():
+        connection = SQLiteConnection(path)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    # The streaming responses check connections out of the pool, one per batch
+    app.get_connection = get_connection
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    sent = 0
+    with get_connection() as db:
+        for part in response(app, db, blog_ids):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            sent += len(part)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte, total, peak, sent
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--blogs', type=int, default=20000)
+    parser.add_argument('--content-size', type=int, default=4000)
+    parser.add_argument('--fetch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = load_app(os.path.join(tmp_dir, "work"))
+        app.STREAM_FETCH_SIZE = args.fetch_size
+
+        path = os.path.join(tmp_dir, "blogs.db")
+        create_database(path, args.blogs, args.content_size)
+        blog_ids = list(range(args.blogs))
+
+        print(f"{'response':<20}{'TTFB ms':>10}{'total ms':>10}{'peak MB':>10}{'sent MB':>10}")
+        for name, response in (("full", full_response), ("streaming", streaming_response),
+                               ("summary", summary_response), ("streaming summary", streaming_summary_response)):
+            first_byte, total, peak, sent = measure(app, response, path, blog_ids)
+            print(f"{name:<20}{1000 * first_byte:>10.1f}{1000 * total:>10.1f}{peak / 2 ** 20:>10.1f}"
+                  f"{sent / 2 ** 20:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares ways of attaching the blog topic to every rating.
+
+The original per-row boolean scan of the blog data is timed on a sample of the ratings and
+extrapolated, since it is O(ratings x blogs) and takes hours at 1M ratings.
+
+Usage:
+python -m benchmarks.bench_topic_join --ratings 1000000 --blogs 10000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from Recommend_Blogs.Topic_Index import TopicIndex
+
+TOPICS = ["ai", "cloud", "cybersecurity", "data-science", "devops", "mobile", "web", "blockchain"]
+
+
+def synthetic_data(n_ratings: int, n_blogs: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    blog_data = pd.DataFrame({
+        "blog_id": np.arange(1, n_blogs + 1, dtype=np.int32),
+        "topic": pd.Categorical(rng.choice(TOPICS, n_blogs)),
+    })
+    ratings_df = pd.DataFrame({
+        "userId": rng.integers(1, n_ratings // 20 + 2, n_ratings, dtype=np.int32),
+        "blog_id": rng.integers(1, n_blogs + 1, n_ratings, dtype=np.int32),
+        "ratings": rng.choice(np.array([0.5, 2, 3.5, 5], dtype=np.float32), n_ratings),
+    })
+    return blog_data, ratings_df
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def loop_join(blog_data, ratings_df):
+    rated_blog_topics = []
+    for blog in ratings_df['blog_id'].tolist():
+        rated_blog_topics.append(blog_data[blog_data['blog_id'] == blog]['topic'].values)
+    return pd.DataFrame(rated_blog_topics)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ratings', type=int, default=1000000)
+    parser.add_argument('--blogs', type=int, default=10000)
+    parser.add_argument('--loop-sample', type=int, default=2000)
+    args = parser.parse_args()
+
+    blog_data, ratings_df = synthetic_data(args.ratings, args.blogs)
+    print(f"{args.ratings} ratings, {args.blogs} blogs")
+
+    sample = ratings_df.head(args.loop_sample)
+    loop_s, _ = timed(lambda: loop_join(blog_data, sample))
+    print(f"{'per-row scan (extrapolated)':<30}{loop_s * args.ratings / len(sample):>10.1f} s")
+
+    merge_s, merged = timed(lambda: ratings_df.merge(blog_data[['blog_id', 'topic']], on='blog_id', how='left'))
+    print(f"{'DataFrame.merge':<30}{merge_s * 1000:>10.1f} ms")
+
+    build_s, topic_index = timed(lambda: TopicIndex.from_blog_data(blog_data))
+    join_s, joined = timed(lambda: topic_index.join(ratings_df.copy()))
+    print(f"{'TopicIndex build':<30}{build_s * 1000:>10.1f} ms")
+    print(f"{'TopicIndex join':<30}{join_s * 1000:>10.1f} ms")
+
+    assert (joined['topic'].astype(str).to_numpy() == merged['topic'].astype(str).to_numpy()).all()
+
+
+if __name__ == '__main__':
+    main()
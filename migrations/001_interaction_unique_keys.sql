@@ -0,0 +1,29 @@
+-- Unique keys required by the interaction writer, whose INSERT IGNORE statements rely on them to
+-- make a repeated seen, like or favourite event a no-op. The API refuses to start without them.
+--
+-- The duplicates are deleted in place with a self-join, so the tables keep their foreign keys,
+-- triggers and grants: of each (user_id, blog_id), the earliest like, the first favourite and the
+-- latest rating are kept, ties broken on the primary key (`id`; use the primary key column of your
+-- schema if it is named differently). The unique keys are then added with ALTER TABLE, which fails
+-- loudly if any duplicate is left. Run it with the API and the recommendation worker stopped:
+--   mysql -h $DB_HOST -u $DB_USER -p $DB_NAME < migrations/001_interaction_unique_keys.sql
+
+DELETE duplicate FROM likes AS duplicate
+JOIN likes AS kept
+  ON kept.user_id = duplicate.user_id AND kept.blog_id = duplicate.blog_id
+ AND (kept.date_created < duplicate.date_created
+      OR (kept.date_created <=> duplicate.date_created AND kept.id < duplicate.id));
+ALTER TABLE likes ADD UNIQUE KEY uq_likes_user_blog (user_id, blog_id);
+
+DELETE duplicate FROM favourites AS duplicate
+JOIN favourites AS kept
+  ON kept.user_id = duplicate.user_id AND kept.blog_id = duplicate.blog_id
+ AND kept.id < duplicate.id;
+ALTER TABLE favourites ADD UNIQUE KEY uq_favourites_user_blog (user_id, blog_id);
+
+DELETE duplicate FROM ratings AS duplicate
+JOIN ratings AS kept
+  ON kept.user_id = duplicate.user_id AND kept.blog_id = duplicate.blog_id
+ AND (kept.timestamp > duplicate.timestamp
+      OR (kept.timestamp <=> duplicate.timestamp AND kept.id > duplicate.id));
+ALTER TABLE ratings ADD UNIQUE KEY uq_ratings_user_blog (user_id, blog_id);